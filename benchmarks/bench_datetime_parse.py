@@ -0,0 +1,79 @@
+"""Time the conversion of date time strings received from ShotGrid.
+
+Run from the repository root:
+
+    python benchmarks/bench_datetime_parse.py
+
+Compares time.strptime, which the client used for every date time string, with the
+fixed-format parser and with the client's cached converter, on values that are all
+different and on values repeated across records as in bulk-created entities.
+"""
+import os
+import sys
+import time
+import random
+import timeit
+import datetime
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from shotgun_api3 import Shotgun
+from shotgun_api3.shotgun import SG_TIMEZONE, _parse_datetime_string
+
+def make_timestamps(count, unique, seed=0):
+    """Return count date time strings drawn from unique different values."""
+    rng = random.Random(seed)
+    values = [
+        f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T"
+        f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:{rng.randint(0, 59):02d}Z"
+        for _ in range(unique)
+    ]
+    return [rng.choice(values) for _ in range(count)]
+
+def convert_strptime(values):
+    """The previous conversion of each value."""
+    for value in values:
+        parsed = datetime.datetime(*time.strptime(value, "%Y-%m-%dT%H:%M:%SZ")[:6])
+        parsed.replace(tzinfo=SG_TIMEZONE.utc).astimezone(SG_TIMEZONE.local)
+
+def convert_fixed_format(values):
+    for value in values:
+        _parse_datetime_string(value).replace(tzinfo=SG_TIMEZONE.utc).astimezone(SG_TIMEZONE.local)
+
+def make_cached_converter():
+    """Return the client's cached conversion and a setup function emptying its cache."""
+    sg = Shotgun("https://benchmark.shotgrid.autodesk.com", "benchmark", "benchmark", connect=False)
+
+    def convert_cached(values):
+        # A new visitor per call, like one per response, sharing the client's cache
+        visitor = sg._inbound_visitor()
+        for value in values:
+            visitor(value)
+
+    def clear_cache():
+        # Every run starts cold, so repeated runs don't measure the previous run's hits
+        sg._datetime_caches.clear()
+    return convert_cached, clear_cache
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark date time string conversion.")
+    parser.add_argument('--count', type=int, default=50000, help="Date time strings per run.")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    for unique in (args.count, args.count // 50):
+        values = make_timestamps(args.count, unique)
+        print(f"{args.count} date times, {unique} different values")
+        timings = {}
+        for label, (function, setup) in (('strptime', (convert_strptime, 'pass')),
+                                         ('fixed', (convert_fixed_format, 'pass')),
+                                         ('cached', make_cached_converter())):
+            timings[label] = min(timeit.repeat(lambda: function(values), setup=setup, number=1,
+                                               repeat=args.repeat))
+            print(f"  {label:<10} {timings[label] * 1000:8.1f} ms"
+                  f" {timings['strptime'] / timings[label]:6.2f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
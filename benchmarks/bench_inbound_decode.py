@@ -0,0 +1,85 @@
+"""Compare decoding ShotGrid read responses with and without the fused inbound transform.
+
+Run from the repository root:
+
+    python benchmarks/bench_inbound_decode.py [recorded_response.json ...]
+
+Without arguments a synthetic response of Version records is used. A recorded
+response is the raw body of a 'read' call, e.g. saved from the shotgun_api3 debug log.
+"""
+import os
+import sys
+import json
+import random
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from shotgun_api3 import Shotgun
+
+HEADERS = {'content-type': 'application/json; charset=utf-8'}
+
+def make_read_response(record_count=5000, seed=0):
+    """Return the json body of a synthetic read of Version records."""
+    rng = random.Random(seed)
+    entities = []
+    for index in range(record_count):
+        entities.append({
+            'type': 'Version',
+            'id': index + 1,
+            'code': f"sh{index // 10:03d}_anim_v{index % 10 + 1:03d}",
+            'description': "Blocking &lt;wip&gt; pass" if index % 7 == 0 else "Animation pass",
+            'created_at': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T10:{index % 60:02d}:00Z",
+            'updated_at': f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T18:{index % 60:02d}:30Z",
+            'sg_status_list': rng.choice(['rev', 'apr', 'wip']),
+            'entity': {'type': 'Shot', 'id': index // 10 + 1, 'name': f"sh{index // 10:03d}"},
+            'user': {'type': 'HumanUser', 'id': rng.randint(1, 40), 'name': "Animator"},
+            'sg_uploaded_movie': {'link_type': 'upload', 'name': 'playblast.mp4', 'content_type': 'video/mp4'},
+            'tags': [{'type': 'Tag', 'id': 1, 'name': 'anim'}],
+            'sg_frames_have_slate': False,
+            'frame_count': rng.randint(24, 480),
+        })
+    response = {'results': {'entities': entities, 'paging_info': {'entity_count': record_count}}}
+    return json.dumps(response).encode('utf-8')
+
+def decode_separate(sg, body):
+    """The previous path: decode, then walk and copy the response to convert date times."""
+    response = sg._decode_response(HEADERS, body)
+    response = sg._transform_inbound(response)
+    return sg._parse_records(response['results']['entities'])
+
+def decode_fused(sg, body):
+    """The current path: date times are converted by the json object hook while decoding."""
+    response = sg._decode_response(HEADERS, body, sg._inbound_object_hook())
+    return sg._parse_records(response['results']['entities'])
+
+def run(name, body, repeat):
+    sg = Shotgun("https://benchmark.shotgrid.autodesk.com", "benchmark", "benchmark", connect=False)
+    if decode_separate(sg, body) != decode_fused(sg, body):
+        raise RuntimeError(f"{name}: the two decoding paths returned different records.")
+
+    print(f"{name} ({len(body) / 1024 / 1024:.1f} MB)")
+    timings = {}
+    for label, function in (('separate', decode_separate), ('fused', decode_fused)):
+        timings[label] = min(timeit.repeat(lambda: function(sg, body), number=1, repeat=repeat))
+        print(f"  {label:<10} {timings[label] * 1000:8.1f} ms")
+    print(f"  speedup    {timings['separate'] / timings['fused']:8.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark decoding of ShotGrid read responses.")
+    parser.add_argument('responses', nargs='*', help="Recorded json response bodies of read calls.")
+    parser.add_argument('--records', type=int, default=20000, help="Records in the synthetic response.")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    if args.responses:
+        for path in args.responses:
+            with open(path, 'rb') as f:
+                run(os.path.basename(path), f.read(), args.repeat)
+    else:
+        run(f"synthetic read, {args.records} Versions", make_read_response(args.records), args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
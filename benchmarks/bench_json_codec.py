@@ -0,0 +1,90 @@
+"""Compare the json codecs the ShotGrid client can use for rpc payloads.
+
+Run from the repository root:
+
+    python benchmarks/bench_json_codec.py [recorded_response.json ...]
+
+Times decoding a read response, on its own and with the date time conversion done
+for every rpc response, and encoding a batch create request with each installed
+codec, after checking it gives the same results as the json module. Recorded response bodies of
+read calls can be passed instead of the synthetic one.
+"""
+import os
+import sys
+import json
+import timeit
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+
+from shotgun_api3 import Shotgun
+from shotgun_api3.shotgun import _JSON_CODECS
+from bench_inbound_decode import make_read_response
+
+def make_batch_payload(sg, request_count=5000):
+    """Return the payload of a batch creating request_count Versions, ready to encode."""
+    requests = [{
+        'request_type': 'create',
+        'entity_type': 'Version',
+        'data': {
+            'code': f"sh{index // 10:03d}_anim_v{index % 10 + 1:03d}",
+            'description': "Playblast – blocking pass",
+            'project': {'type': 'Project', 'id': 1},
+            'entity': {'type': 'Shot', 'id': index // 10 + 1},
+            'sg_status_list': 'rev',
+            'sg_path_to_movie': f"//server/outputs/sh{index // 10:03d}/playblast.mp4",
+            'frame_count': 120,
+        },
+        'return_fields': ['id', 'code'],
+    } for index in range(request_count)]
+    return sg._build_payload('batch', sg._transform_outbound(requests), include_auth_params=False)
+
+def time_min(function, repeat):
+    return min(timeit.repeat(function, number=1, repeat=repeat))
+
+def run(name, sg, body, payload, repeat):
+    print(f"{name} ({len(body) / 1024 / 1024:.1f} MB response)")
+    hook = sg._inbound_object_hook
+    expected_response = _JSON_CODECS['json'].loads(body, hook())
+    expected_payload = json.loads(_JSON_CODECS['json'].dumps(payload))
+
+    timings = {}
+    for codec_name in ('json', 'orjson', 'ujson'):
+        codec = _JSON_CODECS[codec_name]
+        if codec is None:
+            print(f"  {codec_name:<8} not installed")
+            continue
+        if codec.loads(body, hook()) != expected_response or codec.loads(body) != json.loads(body):
+            raise RuntimeError(f"{codec_name} decoded the response differently from the json module.")
+        if json.loads(codec.dumps(payload)) != expected_payload:
+            raise RuntimeError(f"{codec_name} encoded the request differently from the json module.")
+
+        timings[codec_name] = (
+            time_min(lambda: codec.loads(body), repeat),
+            time_min(lambda: codec.loads(body, hook()), repeat),
+            time_min(lambda: codec.dumps(payload), repeat),
+        )
+        columns = zip(('decode', 'rpc decode', 'encode'), timings[codec_name], timings['json'])
+        print(f"  {codec_name:<8}" + "".join(
+            f"   {label} {timing * 1000:7.1f} ms {baseline / timing:5.2f}x"
+            for label, timing, baseline in columns))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the json codecs of the ShotGrid client.")
+    parser.add_argument('responses', nargs='*', help="Recorded json response bodies of read calls.")
+    parser.add_argument('--records', type=int, default=20000, help="Records in the synthetic response.")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    sg = Shotgun("https://benchmark.shotgrid.autodesk.com", "benchmark", "benchmark", connect=False)
+    payload = make_batch_payload(sg)
+    if args.responses:
+        for path in args.responses:
+            with open(path, 'rb') as f:
+                run(os.path.basename(path), sg, f.read(), payload, args.repeat)
+    else:
+        run(f"synthetic read, {args.records} Versions", sg, make_read_response(args.records), payload, args.repeat)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
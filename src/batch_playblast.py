@@ -0,0 +1,212 @@
+"""Headless batch playblast runner.
+
+Playblasts a list of scene files off-screen in mayapy, encodes each one to MP4 and
+publishes the movies to ShotGrid:
+
+    python -m batch_playblast --mayapy /path/to/mayapy --ffmpeg /path/to/ffmpeg scene1.ma scene2.ma
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+import frame_utils
+import ffmpeg_utils
+import playblast_utils
+
+def check_frames(frames_dir, name, start, end, capture_time):
+    """Raise if the capture of start-end left missing or outdated frames in frames_dir."""
+    # Written by another process, so the cached scan can't be trusted
+    sequence = frame_utils.scan_frame_sequence(frames_dir, name, use_cache=False)
+    problems = frame_utils.find_sequence_problems(sequence, start, end, range(start, end + 1), capture_time)
+    if problems:
+        raise RuntimeError("Capture of {} is incomplete: {}.".format(sequence.pattern, ", ".join(problems)))
+
+def get_encode_kwargs(output_path, encode_options):
+    """Return build_sequence_command keyword arguments for encode_options and a movie path."""
+    encode_kwargs = dict(encode_options or {})
+    renditions = encode_kwargs.pop('renditions', None) or []
+    encode_kwargs['extra_outputs'] = ffmpeg_utils.get_rendition_outputs(output_path, renditions,
+                                                                        ffmpeg_utils.ENCODE_PROFILES)
+    return encode_kwargs
+
+def build_scene_previews(ffmpeg_path, frames_dir, name, start, end):
+    """Make the thumbnail and filmstrip of a capture, or return None if FFmpeg fails."""
+    frame_pattern = os.path.join(frames_dir, name + ".{:04d}.jpg")
+    return ffmpeg_utils.try_build_previews(
+        ffmpeg_path,
+        [frame_pattern.format(frame) for frame in ffmpeg_utils.sample_frames(range(start, end + 1))],
+        os.path.dirname(frames_dir),
+        name
+    )
+
+def capture_and_encode(scene_path, capture, ffmpeg_path, frames_dir, name, output_path, capture_options=None,
+                       encode_options=None):
+    """Capture a scene into frames_dir and encode the captured frames to output_path.
+
+    capture_options may hold a 'start' and 'end' to capture part of the scene's range.
+    Returns the capture result and the paths of the movie and its renditions.
+    """
+    capture_time = time.time()
+    result = capture.capture(scene_path, frames_dir, name, **(capture_options or {}))
+    if result['frame_rate'] <= 0:
+        raise RuntimeError(f"Unsupported frame rate in '{scene_path}'.")
+    check_frames(frames_dir, name, result['start'], result['end'], capture_time)
+
+    encode_kwargs = get_encode_kwargs(output_path, encode_options)
+    output_paths = [output_path] + [output[0] for output in encode_kwargs['extra_outputs']]
+    for path in output_paths:
+        if os.path.exists(path):
+            os.remove(path)
+
+    ffmpeg_command = ffmpeg_utils.build_sequence_command(
+        ffmpeg_path,
+        os.path.join(frames_dir, name + ".%04d.jpg"),
+        result['start'],
+        result['frame_rate'],
+        output_path,
+        # Frames of an older, longer take may still follow the captured range
+        frame_count=result['end'] - result['start'] + 1,
+        **encode_kwargs
+    )
+    print("FFmpeg Command: {}".format(" ".join(ffmpeg_command)))
+    subprocess.run(ffmpeg_command, check=True)
+    return result, output_paths
+
+def playblast_scene(scene_path, capture, ffmpeg_path, capture_options=None, encode_options=None):
+    """Capture and encode one scene, returning the paths of its movie and previews."""
+    name, ext, output_dir, frames_dir = playblast_utils.get_playblast_paths(scene_path)
+    print(f"Playblasting {scene_path}")
+
+    mp4_output_path = os.path.join(output_dir, name + ".mp4")
+    result, _ = capture_and_encode(scene_path, capture, ffmpeg_path, frames_dir, name, mp4_output_path,
+                                   capture_options, encode_options)
+    previews = build_scene_previews(ffmpeg_path, frames_dir, name, result['start'], result['end'])
+    return mp4_output_path, previews
+
+def playblast_scene_split(scene_path, capture, ffmpeg_path, chunks, capture_options=None, encode_options=None):
+    """Capture and encode one scene as chunks frame ranges in parallel, returning its movie and previews.
+
+    Every chunk is captured by its own capture process and encoded to a segment,
+    then the segments are joined with FFmpeg's concat demuxer.
+    """
+    name, ext, output_dir, frames_dir = playblast_utils.get_playblast_paths(scene_path)
+    capture_options = dict(capture_options or {})
+    start = capture_options.pop('start', None)
+    end = capture_options.pop('end', None)
+    if start is None or end is None:
+        info = capture.scene_info(scene_path)
+        start = info['start'] if start is None else start
+        end = info['end'] if end is None else end
+
+    # Kept apart from the segments the UI's frame manifest tracks in 'segments'
+    segments_dir = os.path.join(output_dir, 'split_segments')
+    os.makedirs(segments_dir, exist_ok=True)
+    ranges = playblast_utils.split_frame_range(start, end, chunks)
+    print(f"Playblasting {scene_path} as {len(ranges)} segments: {ranges}")
+
+    def _segment(frame_range):
+        segment_start, segment_end = frame_range
+        segment_path = os.path.join(segments_dir, f"{name}.{segment_start:04d}-{segment_end:04d}.mp4")
+        _, segment_paths = capture_and_encode(scene_path, capture, ffmpeg_path, frames_dir, name, segment_path,
+                                              dict(capture_options, start=segment_start, end=segment_end),
+                                              encode_options)
+        return segment_paths
+
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        segment_paths = list(executor.map(_segment, ranges))
+
+    # segment_paths holds one [movie, rendition, ...] list per range, joined per output
+    mp4_output_path = os.path.join(output_dir, name + ".mp4")
+    output_paths = [mp4_output_path] + [output[0] for output in
+                                        get_encode_kwargs(mp4_output_path, encode_options)['extra_outputs']]
+    for output_path, output_segments in zip(output_paths, zip(*segment_paths)):
+        ffmpeg_utils.concat_segments(ffmpeg_path, output_segments, output_path)
+    shutil.rmtree(segments_dir, ignore_errors=True)
+    return mp4_output_path, build_scene_previews(ffmpeg_path, frames_dir, name, start, end)
+
+def run_batch(scene_paths, capture, ffmpeg_path, workers=1, publish=True, capture_options=None, split=1,
+              encode_options=None):
+    """Playblast, encode and optionally publish many scenes.
+
+    Each scene is captured by capture (a playblast_utils.PlayblastCapture), up to
+    workers scenes at a time. With split above 1 every scene's frame range is also
+    divided between that many parallel captures. encode_options holds the 'profile',
+    'threads' and extra 'renditions' passed to the FFmpeg commands. Returns one dict per scene with
+    'scene', 'movie', 'previews', 'url' and 'error' keys.
+    """
+    results = [{'scene': scene_path, 'movie': None, 'previews': None, 'url': None, 'error': None}
+               for scene_path in scene_paths]
+
+    def _playblast(result):
+        try:
+            if split > 1:
+                result['movie'], result['previews'] = playblast_scene_split(
+                    result['scene'], capture, ffmpeg_path, split, capture_options, encode_options
+                )
+            else:
+                result['movie'], result['previews'] = playblast_scene(
+                    result['scene'], capture, ffmpeg_path, capture_options, encode_options
+                )
+        except Exception as e:
+            print(f"Playblast of {result['scene']} failed: {e}")
+            result['error'] = e
+
+    # Each capture runs in its own mayapy process, the threads only wait on them
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        list(executor.map(_playblast, results))
+
+    finished = [result for result in results if result['movie']]
+    if publish and finished:
+        # Imported here as it connects to ShotGrid on import
+        import shotgrid_utils
+        items = [(os.path.basename(result['scene']), result['movie'], result['previews']) for result in finished]
+        for result, publish_result in zip(finished, shotgrid_utils.publish_many(items)):
+            result['url'] = publish_result['url']
+            result['error'] = publish_result['error']
+
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Playblast, encode and publish Maya scenes without the UI.")
+    parser.add_argument('scenes', nargs='+', help="Scene files to playblast.")
+    parser.add_argument('--mayapy', required=True, help="Path to the mayapy executable.")
+    parser.add_argument('--ffmpeg', required=True, help="Path to the FFmpeg executable.")
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Number of scenes captured at the same time.")
+    parser.add_argument('--width', type=int, help="Playblast width, defaults to the scene resolution.")
+    parser.add_argument('--height', type=int, help="Playblast height, defaults to the scene resolution.")
+    parser.add_argument('--camera', help="Camera to playblast, defaults to the first renderable camera.")
+    parser.add_argument('--split', type=int, default=1,
+                        help="Split each scene's frame range between this many parallel mayapy captures.")
+    parser.add_argument('--profile', choices=sorted(ffmpeg_utils.ENCODE_PROFILES),
+                        default=ffmpeg_utils.DEFAULT_ENCODE_PROFILE, help="Encode profile for the movies.")
+    parser.add_argument('--threads', type=int, default=ffmpeg_utils.get_default_encode_threads(),
+                        help="Maximum CPU threads per FFmpeg encode.")
+    parser.add_argument('--renditions', action='store_true',
+                        help="Also encode the editorial and mobile renditions in the same pass.")
+    parser.add_argument('--no-publish', action='store_true', help="Only encode the movies, don't upload them.")
+    args = parser.parse_args(argv)
+
+    capture = playblast_utils.MayapyCapture(args.mayapy)
+    capture_options = {'width': args.width, 'height': args.height, 'camera': args.camera}
+    encode_options = {'profile': ffmpeg_utils.ENCODE_PROFILES[args.profile], 'threads': args.threads}
+    if args.renditions:
+        encode_options['renditions'] = ffmpeg_utils.RENDITIONS
+    results = run_batch(args.scenes, capture, args.ffmpeg, workers=args.workers,
+                        publish=not args.no_publish, capture_options=capture_options, split=args.split,
+                        encode_options=encode_options)
+
+    failed = 0
+    for result in results:
+        if result['error']:
+            failed += 1
+            print(f"FAILED    {result['scene']}: {result['error']}")
+        else:
+            print(f"OK        {result['scene']} -> {result['url'] or result['movie']}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
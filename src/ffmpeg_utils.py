@@ -0,0 +1,391 @@
+import os
+import subprocess
+import frame_utils
+
+# Encode profiles map a name to the encoder settings used by build_output_args.
+# Users can override them or add their own in AnimationPublisher.json.
+ENCODE_PROFILES = {
+    'dailies-fast': {
+        'codec': 'libx264',
+        'preset': 'ultrafast',
+        'tune': 'animation',
+        'crf': 23,
+        'pix_fmt': 'yuv420p',
+    },
+    'review-quality': {
+        'codec': 'libx264',
+        'preset': 'medium',
+        'tune': 'animation',
+        'crf': 18,
+        'pix_fmt': 'yuv420p',
+    },
+    'archive': {
+        'codec': 'libx264',
+        'preset': 'slow',
+        'crf': 12,
+        'pix_fmt': 'yuv420p',
+    },
+    'editorial-prores': {
+        'codec': 'prores_ks',
+        'pix_fmt': 'yuv422p10le',
+        'extra_args': ['-profile:v', '3'],
+    },
+    'editorial-dnxhr': {
+        'codec': 'dnxhd',
+        'pix_fmt': 'yuv422p',
+        'extra_args': ['-profile:v', 'dnxhr_hq'],
+    },
+    'mobile-proxy': {
+        'codec': 'libx264',
+        'preset': 'veryfast',
+        'crf': 28,
+        'pix_fmt': 'yuv420p',
+        'scale': '-2:540',
+    },
+}
+DEFAULT_ENCODE_PROFILE = 'review-quality'
+
+# ShotGrid filmstrips are strips of frames exactly 240 pixels wide
+FILMSTRIP_FRAME_WIDTH = 240
+THUMBNAIL_WIDTH = 640
+# Frames sampled from a capture for its filmstrip
+PREVIEW_FRAMES = 10
+
+# Part of every segment digest. Bump it when the way segments are encoded changes,
+# so segments encoded the old way are encoded again instead of reused.
+SEGMENT_FORMAT = 2
+
+# Extra renditions encoded in the same pass as the review movie. Each is written
+# next to it with the suffix and extension added to its name.
+RENDITIONS = [
+    {'profile': 'editorial-prores', 'suffix': '_editorial', 'ext': '.mov'},
+    {'profile': 'mobile-proxy', 'suffix': '_mobile', 'ext': '.mp4'},
+]
+
+def get_default_encode_threads():
+    """Return the encode thread limit used when none is configured, leaving half the cores to Maya."""
+    return max(1, (os.cpu_count() or 2) // 2)
+
+def get_encode_profiles(custom_profiles=None):
+    """Return the built-in encode profiles updated with custom_profiles from the config."""
+    profiles = {name: dict(profile) for name, profile in ENCODE_PROFILES.items()}
+    profiles.update(custom_profiles or {})
+    return profiles
+
+def get_rendition_outputs(output_path, renditions, profiles):
+    """Return (output_path, profile) pairs for the renditions of a movie."""
+    base_path = os.path.splitext(output_path)[0]
+    return [
+        (base_path + rendition['suffix'] + rendition['ext'], profiles[rendition['profile']])
+        for rendition in renditions
+    ]
+
+def build_output_args(output_path, profile=None, threads=None, frame_count=None):
+    """Return the FFmpeg encoder arguments used for playblast movies.
+
+    profile is an encode profile dict, DEFAULT_ENCODE_PROFILE by default. threads
+    caps the encoder threads, along with any 'threads' the profile sets. When
+    frame_count is given only that many frames are written to the output.
+    """
+    if profile is None:
+        profile = ENCODE_PROFILES[DEFAULT_ENCODE_PROFILE]
+    args = []
+    if profile.get('scale'):
+        args += ['-vf', 'scale={}'.format(profile['scale'])]
+    args += ['-c:v', profile.get('codec', 'libx264')]
+    for key in ('preset', 'tune', 'crf'):
+        if profile.get(key) is not None:
+            args += ['-' + key, str(profile[key])]
+    args += ['-pix_fmt', profile.get('pix_fmt', 'yuv420p')]
+    args += [str(arg) for arg in profile.get('extra_args', [])]
+
+    thread_limits = [limit for limit in (profile.get('threads'), threads) if limit]
+    if thread_limits:
+        args += ['-threads', str(min(thread_limits))]
+    if frame_count:
+        args += ['-frames:v', str(frame_count)]
+    return args + [output_path]
+
+def build_outputs_args(outputs, threads=None, frame_count=None):
+    """Return the FFmpeg arguments that encode the input to several (output_path, profile) outputs.
+
+    FFmpeg decodes the input once and splits the frames between the outputs'
+    filters and encoders, which share the thread limit. Output options only apply
+    to the next output file, so frame_count is repeated for every output.
+    """
+    if len(outputs) == 1:
+        return build_output_args(outputs[0][0], outputs[0][1], threads, frame_count)
+    if threads:
+        threads = max(1, threads // len(outputs))
+    args = []
+    for output_path, profile in outputs:
+        args += ['-map', '0:v'] + build_output_args(output_path, profile, threads, frame_count)
+    return args
+
+def build_sequence_command(ffmpeg_path, frame_pattern, first_frame, frame_rate, output_path, frame_count=None,
+                           profile=None, threads=None, extra_outputs=None):
+    """Build an FFmpeg command that encodes an image sequence on disk.
+
+    When frame_count is given only that many frames from first_frame are encoded.
+    extra_outputs are (output_path, profile) renditions encoded in the same pass.
+    """
+    command = [
+        ffmpeg_path,
+        '-framerate', str(frame_rate),
+        '-start_number', str(first_frame),
+        '-i', frame_pattern,
+    ]
+    outputs = [(output_path, profile)] + list(extra_outputs or [])
+    return command + build_outputs_args(outputs, threads, frame_count)
+
+def _write_concat_list(list_path, paths):
+    """Write the file list read by FFmpeg's concat demuxer."""
+    with open(list_path, 'w') as f:
+        for path in paths:
+            # The concat demuxer reads paths in single quotes, escaped the shell way
+            f.write("file '{}'\n".format(os.path.abspath(path).replace("'", "'\\''")))
+
+def concat_segments(ffmpeg_path, segment_paths, output_path):
+    """Join movie segments encoded with the same settings into one movie without re-encoding."""
+    list_path = output_path + ".segments.txt"
+    _write_concat_list(list_path, segment_paths)
+
+    command = [
+        ffmpeg_path,
+        '-y',
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', list_path,
+        '-c', 'copy',
+        output_path
+    ]
+    print("FFmpeg Command: {}".format(" ".join(command)))
+    try:
+        subprocess.run(command, check=True)
+    finally:
+        os.remove(list_path)
+    return output_path
+
+def sample_frames(frames, count=PREVIEW_FRAMES):
+    """Return up to count evenly spaced items of frames, always including the first and last."""
+    frames = list(frames)
+    if len(frames) <= count:
+        return frames
+    if count == 1:
+        return [frames[len(frames) // 2]]
+    step = (len(frames) - 1) / (count - 1)
+    return [frames[int(round(index * step))] for index in range(count)]
+
+def build_previews(ffmpeg_path, frame_paths, thumbnail_path, filmstrip_path):
+    """Make a ShotGrid thumbnail and filmstrip from a few frame images in one FFmpeg run.
+
+    The frames are decoded once, then tiled side by side at FILMSTRIP_FRAME_WIDTH
+    for the filmstrip, and the middle one is scaled to THUMBNAIL_WIDTH for the
+    thumbnail. Returns a dict with the 'thumbnail' and 'filmstrip' paths.
+    """
+    list_path = filmstrip_path + ".frames.txt"
+    _write_concat_list(list_path, frame_paths)
+
+    filter_graph = (
+        "[0:v]split=2[strip][poster];"
+        "[strip]scale={width}:-2,tile={count}x1[filmstrip];"
+        "[poster]select='eq(n,{middle})',scale={thumbnail_width}:-2[thumbnail]"
+    ).format(width=FILMSTRIP_FRAME_WIDTH, count=len(frame_paths), middle=len(frame_paths) // 2,
+             thumbnail_width=THUMBNAIL_WIDTH)
+    command = [
+        ffmpeg_path,
+        '-y',
+        '-f', 'concat',
+        '-safe', '0',
+        '-i', list_path,
+        '-filter_complex', filter_graph,
+        '-map', '[filmstrip]', '-frames:v', '1', '-q:v', '2', filmstrip_path,
+        '-map', '[thumbnail]', '-frames:v', '1', '-q:v', '2', thumbnail_path,
+    ]
+    print("FFmpeg Command: {}".format(" ".join(command)))
+    try:
+        subprocess.run(command, check=True)
+    finally:
+        os.remove(list_path)
+    return {'thumbnail': thumbnail_path, 'filmstrip': filmstrip_path}
+
+def try_build_previews(ffmpeg_path, frame_paths, output_dir, base_name, warn=print):
+    """Make the thumbnail and filmstrip of base_name in output_dir, or return None if FFmpeg fails.
+
+    Previews are a nicety, so a failure is passed to warn instead of stopping the publish.
+    """
+    try:
+        return build_previews(
+            ffmpeg_path,
+            frame_paths,
+            os.path.join(output_dir, base_name + "_thumbnail.jpg"),
+            os.path.join(output_dir, base_name + "_filmstrip.jpg")
+        )
+    except (subprocess.CalledProcessError, OSError) as e:
+        warn(f"Failed to create the thumbnail and filmstrip of {base_name}: {e}")
+        return None
+
+def build_stream_command(ffmpeg_path, frame_rate, output_path, profile=None, threads=None, extra_outputs=None):
+    """Build an FFmpeg command that encodes PNG frames piped over stdin."""
+    return [
+        ffmpeg_path,
+        '-y',
+        '-f', 'image2pipe',
+        '-framerate', str(frame_rate),
+        '-c:v', 'png',
+        '-i', '-',
+    ] + build_outputs_args([(output_path, profile)] + list(extra_outputs or []), threads)
+
+class FFmpegStreamEncoder(object):
+    """Long-lived FFmpeg process fed one encoded frame at a time over stdin."""
+
+    def __init__(self, ffmpeg_path, output_path, frame_rate, profile=None, threads=None, extra_outputs=None):
+        self.output_path = output_path
+        self.output_paths = [output_path] + [extra_output[0] for extra_output in extra_outputs or []]
+        self.command = build_stream_command(ffmpeg_path, frame_rate, output_path, profile, threads, extra_outputs)
+        self.frame_count = 0
+        print("FFmpeg Command: {}".format(" ".join(self.command)))
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE)
+
+    def write_frame(self, data):
+        """Send the bytes of one PNG frame to the encoder."""
+        try:
+            self.process.stdin.write(data)
+        except (BrokenPipeError, OSError):
+            # FFmpeg exited early, close() reports its return code.
+            self.close()
+        self.frame_count += 1
+
+    def write_frame_file(self, frame_path):
+        """Send a frame image from disk to the encoder."""
+        with open(frame_path, 'rb') as f:
+            self.write_frame(f.read())
+
+    def close(self):
+        """Finish the stream and wait for FFmpeg to write the movie."""
+        if not self.process.stdin.closed:
+            try:
+                self.process.stdin.close()
+            except (BrokenPipeError, OSError):
+                pass
+        return_code = self.process.wait()
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, self.command)
+        return self.output_path
+
+    def abort(self):
+        """Stop the encoder and remove the partial movies."""
+        if self.process.poll() is None:
+            self.process.kill()
+            self.process.wait()
+        for output_path in self.output_paths:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+class SegmentedEncode(object):
+    """Encodes a JPEG sequence as fixed-length segments joined into one movie.
+
+    A manifest of frame hashes is kept at manifest_path. Segments whose frames and
+    encode settings are unchanged since the last encode are reused as they are, so
+    only the segments containing changed frames are encoded again. Each segment is
+    encoded to the movie and all extra_outputs renditions in one pass. Call
+    prepare(), run commands in order, then call finish() to join the segments and
+    record the new manifest.
+    """
+
+    def __init__(self, ffmpeg_path, sequence, first_frame, last_frame, frame_rate,
+                 output_path, manifest_path, segment_frames=frame_utils.SEGMENT_FRAMES,
+                 profile=None, threads=None, extra_outputs=None):
+        self.ffmpeg_path = ffmpeg_path
+        self.sequence = sequence
+        self.first_frame = first_frame
+        self.last_frame = last_frame
+        self.frame_rate = frame_rate
+        self.output_path = output_path
+        self.manifest_path = manifest_path
+        self.segment_frames = segment_frames
+        self.profile = profile
+        self.threads = threads
+        self.outputs = [(output_path, profile)] + list(extra_outputs or [])
+        self.segments_dir = os.path.join(os.path.dirname(output_path), 'segments')
+        self.segment_paths = {output: [] for output, _ in self.outputs}
+        self.segment_count = 0
+        self.commands = []
+        self.frame_count = 0
+        self._manifest = None
+        self._encoded_segments = {}
+
+    @property
+    def reused_count(self):
+        """Return the number of segments that don't need encoding."""
+        return self.segment_count - len(self.commands)
+
+    def prepare(self):
+        """Hash the frames and build the commands for the segments that changed.
+
+        Hashing reads every new frame, so this is meant to run off the UI thread.
+        """
+        # Never encode, and so never upload, a movie with holes in it
+        problems = frame_utils.find_sequence_problems(self.sequence, self.first_frame, self.last_frame)
+        if problems:
+            raise RuntimeError("Can't encode {}: {}.".format(self.sequence.pattern, ", ".join(problems)))
+
+        previous = frame_utils.load_frame_manifest(self.manifest_path)
+        frames = frame_utils.build_frame_entries(self.sequence, self.first_frame, self.last_frame,
+                                                 previous['frames'])
+        self._manifest = {'frames': frames, 'segments': {}}
+        # The thread count doesn't change the stream format, so it doesn't invalidate segments
+        settings = [SEGMENT_FORMAT, self.frame_rate]
+        for output_path, profile in self.outputs:
+            profile = dict(profile or ENCODE_PROFILES[DEFAULT_ENCODE_PROFILE])
+            profile.pop('threads', None)
+            settings.append(" ".join(build_output_args(os.path.basename(output_path), profile)))
+
+        for segment_start, segment_end in frame_utils.segment_ranges(self.first_frame, self.last_frame,
+                                                                     self.segment_frames):
+            segment_outputs = []
+            for output_path, profile in self.outputs:
+                name, ext = os.path.splitext(os.path.basename(output_path))
+                segment_path = os.path.join(self.segments_dir, f"{name}.{segment_start:04d}-{segment_end:04d}{ext}")
+                self.segment_paths[output_path].append(segment_path)
+                segment_outputs.append((segment_path, profile))
+            segment_name = os.path.basename(segment_outputs[0][0])
+            self.segment_count += 1
+
+            digest = frame_utils.segment_digest(frames, segment_start, segment_end, *settings)
+            if (digest and digest == previous['segments'].get(segment_name)
+                    and all(os.path.exists(segment_path) for segment_path, _ in segment_outputs)):
+                self._manifest['segments'][segment_name] = digest
+                continue
+
+            # Recorded only once the segment has been encoded, see finish()
+            self._encoded_segments[segment_name] = digest
+            frame_count = segment_end - segment_start + 1
+            self.frame_count += frame_count
+            command = build_sequence_command(
+                self.ffmpeg_path,
+                self.sequence.pattern,
+                segment_start,
+                self.frame_rate,
+                segment_outputs[0][0],
+                frame_count=frame_count,
+                profile=self.profile,
+                threads=self.threads,
+                extra_outputs=segment_outputs[1:]
+            )
+            self.commands.append(command[:1] + ['-y'] + command[1:])
+
+        os.makedirs(self.segments_dir, exist_ok=True)
+        # Saved before encoding so an interrupted encode can't leave a stale
+        # segment that the manifest still vouches for.
+        frame_utils.save_frame_manifest(self.manifest_path, self._manifest)
+
+    def finish(self):
+        """Join the segments into the output movies and record the encoded segments."""
+        for output_path, _ in self.outputs:
+            concat_segments(self.ffmpeg_path, self.segment_paths[output_path], output_path)
+        for segment_name, digest in self._encoded_segments.items():
+            if digest:
+                self._manifest['segments'][segment_name] = digest
+        frame_utils.save_frame_manifest(self.manifest_path, self._manifest)
+        return self.output_path
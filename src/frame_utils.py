@@ -0,0 +1,326 @@
+import os
+import json
+import math
+import hashlib
+import threading
+
+# Frames per encoded movie segment, see segment_ranges
+SEGMENT_FRAMES = 48
+
+# Seconds of clock difference allowed between Maya and the file server when
+# checking that captured frames are newer than the capture
+MTIME_TOLERANCE = 2.0
+
+def parse_frame_ranges(text):
+    """Parse a frame list such as '40-60, 100' into merged (start, end) ranges."""
+    ranges = []
+    for part in text.replace(';', ',').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        start, separator, end = part.partition('-')
+        try:
+            start = int(start)
+            end = int(end) if separator else start
+        except ValueError:
+            raise ValueError(f"Invalid frame range '{part}', expected e.g. '40-60, 100'.")
+        ranges.append((min(start, end), max(start, end)))
+    return merge_frame_ranges(ranges)
+
+def merge_frame_ranges(ranges):
+    """Sort (start, end) ranges and merge the ones that overlap or touch."""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+def clip_frame_ranges(ranges, start, end):
+    """Limit (start, end) ranges to the frames between start and end."""
+    clipped = []
+    for range_start, range_end in ranges:
+        range_start, range_end = max(range_start, start), min(range_end, end)
+        if range_start <= range_end:
+            clipped.append((range_start, range_end))
+    return clipped
+
+def frames_in_ranges(ranges):
+    """Return the sorted frame numbers covered by (start, end) ranges."""
+    frames = set()
+    for start, end in ranges:
+        frames.update(range(start, end + 1))
+    return sorted(frames)
+
+def frames_to_ranges(frames):
+    """Collapse frame numbers into merged (start, end) ranges."""
+    return merge_frame_ranges([(frame, frame) for frame in frames])
+
+def format_frame_ranges(ranges):
+    """Format (start, end) ranges back into the '40-60, 100' form."""
+    return ", ".join(str(start) if start == end else f"{start}-{end}" for start, end in ranges)
+
+def segment_ranges(start, end, segment_frames=SEGMENT_FRAMES):
+    """Split start-end into (start, end) segments aligned to multiples of segment_frames.
+
+    Aligning to absolute frame numbers keeps the segments of two takes lined up even
+    when the playback range changes.
+    """
+    ranges = []
+    segment_start = start
+    while segment_start <= end:
+        segment_end = min(end, (segment_start // segment_frames + 1) * segment_frames - 1)
+        ranges.append((segment_start, segment_end))
+        segment_start = segment_end + 1
+    return ranges
+
+################################################################################
+# Frame Sequence Index
+################################################################################
+# Scans are cached per folder and reused until the folder's mtime changes. Files
+# overwritten in place don't always change the folder's mtime, so anything that
+# writes frames should call invalidate_frame_sequence() afterwards.
+
+_sequence_cache = {}
+_sequence_cache_lock = threading.Lock()
+
+class FrameSequence(object):
+    """The frames of one <base_name>.<frame>.<ext> sequence found in a folder."""
+
+    def __init__(self, frames_dir, base_name, ext, frames, padding=4):
+        self.frames_dir = frames_dir
+        self.base_name = base_name
+        self.ext = ext
+        self.frames = frames  # {frame: (size, mtime)}
+        self.padding = padding
+
+    @property
+    def first_frame(self):
+        return min(self.frames) if self.frames else None
+
+    @property
+    def last_frame(self):
+        return max(self.frames) if self.frames else None
+
+    @property
+    def pattern(self):
+        """Return the FFmpeg/printf style path of the sequence, e.g. shot.%04d.jpg."""
+        return os.path.join(self.frames_dir, f"{self.base_name}.%0{self.padding}d.{self.ext}")
+
+    def frame_path(self, frame):
+        return os.path.join(self.frames_dir, f"{self.base_name}.{frame:0{self.padding}d}.{self.ext}")
+
+    def stat(self, frame):
+        """Return (size, mtime) of a frame, or None if it doesn't exist."""
+        return self.frames.get(frame)
+
+    def missing_frames(self, start=None, end=None):
+        """Return the frames between start and end (default first and last frame) that don't exist."""
+        start = self.first_frame if start is None else start
+        end = self.last_frame if end is None else end
+        if start is None or end is None:
+            return []
+        return [frame for frame in range(start, end + 1) if frame not in self.frames]
+
+    def gaps(self):
+        """Return the (start, end) ranges missing between the first and last frame."""
+        return frames_to_ranges(self.missing_frames())
+
+    def stale_frames(self, start, end):
+        """Return the existing frames outside start-end, e.g. the tail of an older, longer take."""
+        return sorted(frame for frame in self.frames if frame < start or frame > end)
+
+def scan_frame_sequence(frames_dir, base_name, ext='jpg', use_cache=True):
+    """Index the frames of a sequence with a single os.scandir pass over frames_dir."""
+    key = (os.path.normpath(frames_dir), base_name, ext)
+    try:
+        folder_mtime = os.stat(frames_dir).st_mtime_ns
+    except OSError:
+        return FrameSequence(frames_dir, base_name, ext, {})
+
+    if use_cache:
+        with _sequence_cache_lock:
+            cached = _sequence_cache.get(key)
+        if cached and cached[0] == folder_mtime:
+            return cached[1]
+
+    prefix, suffix = base_name + '.', '.' + ext
+    frames = {}
+    paddings = {}
+    with os.scandir(frames_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if not name.startswith(prefix) or not name.endswith(suffix):
+                continue
+            digits = name[len(prefix):-len(suffix)]
+            if not digits.isdigit():
+                continue
+            stat = entry.stat()
+            frames[int(digits)] = (stat.st_size, stat.st_mtime)
+            paddings[len(digits)] = paddings.get(len(digits), 0) + 1
+
+    padding = max(paddings, key=paddings.get) if paddings else 4
+    sequence = FrameSequence(frames_dir, base_name, ext, frames, padding)
+    with _sequence_cache_lock:
+        _sequence_cache[key] = (folder_mtime, sequence)
+    return sequence
+
+def remove_frames(sequence, frames):
+    """Delete frames of a sequence from disk and forget the cached scan."""
+    for frame in frames:
+        try:
+            os.remove(sequence.frame_path(frame))
+        except FileNotFoundError:
+            pass
+    invalidate_frame_sequence(sequence.frames_dir)
+
+def find_sequence_problems(sequence, start, end, captured_frames=(), captured_after=None):
+    """Return messages describing why the frames of a sequence can't be encoded as start-end.
+
+    Frames in captured_frames must also be newer than the captured_after timestamp,
+    otherwise the capture didn't write them and they are left over from an older take.
+    """
+    problems = []
+    missing = sequence.missing_frames(start, end)
+    if missing:
+        problems.append(f"missing frames {format_frame_ranges(frames_to_ranges(missing))}")
+
+    if captured_after is not None:
+        captured_after -= MTIME_TOLERANCE
+        outdated = [frame for frame in captured_frames
+                    if frame in sequence.frames and sequence.frames[frame][1] < captured_after]
+        if outdated:
+            problems.append(f"frames older than the capture {format_frame_ranges(frames_to_ranges(outdated))}")
+    return problems
+
+def invalidate_frame_sequence(frames_dir):
+    """Forget the cached scans of frames_dir."""
+    frames_dir = os.path.normpath(frames_dir)
+    with _sequence_cache_lock:
+        for key in [key for key in _sequence_cache if key[0] == frames_dir]:
+            del _sequence_cache[key]
+
+################################################################################
+# Frame Manifests
+################################################################################
+# A manifest records the content hash, size and mtime of every captured frame,
+# plus a digest of the frames each encoded segment was made from, so unchanged
+# segments can be reused instead of encoded again.
+
+def hash_file(path, block_size=1024 * 1024):
+    """Return the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_frame_manifest(path):
+    """Load a frame manifest, or return an empty one if there isn't a usable one."""
+    manifest = {'frames': {}, 'segments': {}}
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                manifest.update(json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable frame manifest {path}: {e}")
+    return manifest
+
+def save_frame_manifest(path, manifest):
+    """Write a frame manifest next to the captured frames."""
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(temp_path, path)
+
+def build_frame_entries(sequence, start, end, previous_frames=None):
+    """Return {frame: {'hash', 'size', 'mtime'}} for the frames of a FrameSequence between start and end.
+
+    Frames whose size and mtime match previous_frames keep their recorded hash,
+    so only new or re-captured frames are read from disk.
+    """
+    previous_frames = previous_frames or {}
+    frames = {}
+    for frame in range(start, end + 1):
+        stat = sequence.stat(frame)
+        if stat is None:
+            continue
+        size, mtime = stat
+        key = str(frame)
+        previous = previous_frames.get(key)
+        if previous and previous['size'] == size and previous['mtime'] == mtime:
+            frames[key] = previous
+        else:
+            frames[key] = {'hash': hash_file(sequence.frame_path(frame)), 'size': size, 'mtime': mtime}
+    return frames
+
+def segment_digest(frames, start, end, *settings):
+    """Return a digest of the frames between start and end and the encode settings.
+
+    Returns None if any of the frames is missing from frames.
+    """
+    digest = hashlib.sha1()
+    for setting in settings:
+        digest.update(f"{setting};".encode('utf-8'))
+    for frame in range(start, end + 1):
+        entry = frames.get(str(frame))
+        if entry is None:
+            return None
+        digest.update(entry['hash'].encode('ascii'))
+    return digest.hexdigest()
+
+################################################################################
+# Animation Snapshots
+################################################################################
+# A snapshot maps each time based animation curve to {'cycles': bool, 'keys': [...]}
+# where keys holds [time, value, in angle, out angle, in weight, out weight] lists.
+# Comparing the snapshot taken at the last capture with the current one tells
+# which frames can have changed.
+
+def load_anim_snapshot(path):
+    """Load an animation snapshot, or return None if there isn't a usable one."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Ignoring unreadable animation snapshot {path}: {e}")
+        return None
+
+def save_anim_snapshot(path, snapshot):
+    """Write an animation snapshot next to the captured frames."""
+    with open(path, 'w') as f:
+        json.dump(snapshot, f)
+
+def diff_anim_snapshots(old_snapshot, new_snapshot):
+    """Return the merged (start, end) frame ranges affected by curve changes.
+
+    A changed key affects the frames between its neighbouring keys. Changes to the
+    first or last key, and any change to a cycling curve, affect every frame before
+    or after them, which is returned as a very large range for the caller to clip.
+    """
+    unbounded = 2 ** 31
+    empty = {'cycles': False, 'keys': []}
+    ranges = []
+    for curve in set(old_snapshot) | set(new_snapshot):
+        old_curve = old_snapshot.get(curve, empty)
+        new_curve = new_snapshot.get(curve, empty)
+        if old_curve == new_curve:
+            continue
+        if old_curve['cycles'] or new_curve['cycles']:
+            ranges.append((-unbounded, unbounded))
+            continue
+
+        old_keys = {key[0]: key for key in old_curve['keys']}
+        new_keys = {key[0]: key for key in new_curve['keys']}
+        times = sorted(set(old_keys) | set(new_keys))
+        for index, time in enumerate(times):
+            if old_keys.get(time) == new_keys.get(time):
+                continue
+            start = math.floor(times[index - 1]) if index > 0 else -unbounded
+            end = math.ceil(times[index + 1]) if index + 1 < len(times) else unbounded
+            ranges.append((start, end))
+
+    return merge_frame_ranges(ranges)
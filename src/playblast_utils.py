@@ -0,0 +1,224 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+FRAME_RATES = {
+    'game': 15.0,
+    'film': 24.0,
+    'pal': 25.0,
+    'ntsc': 30.0,
+    'show': 48.0,
+    'palf': 50.0,
+    'ntscf': 60.0,
+}
+
+# Marks the line of a mayapy worker's output that holds the capture result
+RESULT_PREFIX = "PRTTM_CAPTURE_RESULT:"
+
+def get_playblast_paths(scene_path):
+    """Return (name, ext, output_dir, frames_dir) for the playblast of a scene file."""
+    file_dir = os.path.dirname(scene_path)
+    base_name = os.path.basename(scene_path)
+    name, ext = os.path.splitext(base_name)
+
+    output_dir = file_dir.replace('/tasks/', '/outputs/')
+    output_dir = os.path.join(output_dir, name, 'playblast')
+    frames_dir = os.path.join(output_dir, 'frames')
+    return name, ext, os.path.normpath(output_dir), os.path.normpath(frames_dir)
+
+def get_frame_rate(time_unit):
+    """Return the frames per second of a Maya time unit, or 0.0 if unknown."""
+    return FRAME_RATES.get(time_unit, 0.0)
+
+def split_frame_range(start, end, chunks):
+    """Split start-end (inclusive) into at most chunks contiguous (start, end) ranges."""
+    start, end = int(round(start)), int(round(end))
+    frame_count = end - start + 1
+    chunks = max(1, min(chunks, frame_count))
+    ranges = []
+    chunk_start = start
+    for index in range(chunks):
+        # Spread the remainder over the first chunks so sizes differ by one frame at most
+        chunk_size = frame_count // chunks + (1 if index < frame_count % chunks else 0)
+        ranges.append((chunk_start, chunk_start + chunk_size - 1))
+        chunk_start += chunk_size
+    return ranges
+
+class PlayblastCapture(object):
+    """The Maya side of a batch playblast.
+
+    capture() opens a scene, playblasts it off-screen into frames_dir as
+    <name>.####.jpg and returns a dict with the 'start', 'end' and 'frame_rate' of
+    the captured frames. scene_info() returns the same keys for the scene's
+    playback range without capturing anything. The batch pipeline only talks to
+    Maya through this interface, so it can be run against a stub without Maya.
+    """
+
+    def capture(self, scene_path, frames_dir, name, width=None, height=None, camera=None,
+                start=None, end=None):
+        raise NotImplementedError
+
+    def scene_info(self, scene_path):
+        raise NotImplementedError
+
+class MayapyCapture(PlayblastCapture):
+    """Captures each scene in its own mayapy process."""
+
+    def __init__(self, mayapy_path):
+        self.mayapy_path = mayapy_path
+
+    def capture(self, scene_path, frames_dir, name, width=None, height=None, camera=None,
+                start=None, end=None):
+        args = [scene_path, frames_dir, name]
+        for flag, value in (('--width', width), ('--height', height), ('--camera', camera),
+                            ('--start', start), ('--end', end)):
+            if value is not None:
+                args += [flag, str(value)]
+        return self._run(scene_path, args)
+
+    def scene_info(self, scene_path):
+        return self._run(scene_path, [scene_path, '--info'])
+
+    def _run(self, scene_path, args):
+        command = [self.mayapy_path, os.path.abspath(__file__)] + args
+        print("Capture Command: {}".format(" ".join(command)))
+        process = subprocess.run(command, stdout=subprocess.PIPE, universal_newlines=True)
+        # Maya prints its own messages, the result is on the line marked with RESULT_PREFIX
+        for line in reversed(process.stdout.splitlines()):
+            if line.startswith(RESULT_PREFIX):
+                return json.loads(line[len(RESULT_PREFIX):])
+        raise RuntimeError(f"mayapy capture of '{scene_path}' failed with exit code {process.returncode}.")
+
+def _find_render_camera(cmds):
+    """Return the first renderable camera that isn't one of the default views."""
+    default_cameras = ['top', 'front', 'side', 'persp']
+    for camera_shape in cmds.ls(type='camera'):
+        camera = cmds.listRelatives(camera_shape, parent=True)[0]
+        if camera not in default_cameras and cmds.getAttr(camera_shape + '.renderable'):
+            return camera
+    return 'persp'
+
+def snapshot_anim_curves(cmds):
+    """Return the keys of every time based animation curve, see frame_utils.diff_anim_snapshots."""
+    cycling_infinity = ('cycle', 'cycleRelative', 'oscillate')
+    snapshot = {}
+    for curve in cmds.ls(type=['animCurveTA', 'animCurveTL', 'animCurveTT', 'animCurveTU']) or []:
+        times = cmds.keyframe(curve, query=True, timeChange=True) or []
+        keys = []
+        if times:
+            keys = [list(key) for key in zip(
+                times,
+                cmds.keyframe(curve, query=True, valueChange=True),
+                cmds.keyTangent(curve, query=True, inAngle=True),
+                cmds.keyTangent(curve, query=True, outAngle=True),
+                cmds.keyTangent(curve, query=True, inWeight=True),
+                cmds.keyTangent(curve, query=True, outWeight=True),
+            )]
+        infinity = (
+            cmds.getAttr(curve + '.preInfinity', asString=True),
+            cmds.getAttr(curve + '.postInfinity', asString=True),
+        )
+        snapshot[curve] = {
+            'cycles': any(mode in cycling_infinity for mode in infinity),
+            'keys': keys,
+        }
+    return snapshot
+
+def _open_scene(scene_path):
+    """Start Maya in this mayapy session and open a scene, returning maya.cmds."""
+    import maya.standalone
+    maya.standalone.initialize(name='python')
+    import maya.cmds as cmds
+
+    cmds.file(scene_path, open=True, force=True)
+    return cmds
+
+def read_scene_info(scene_path):
+    """Open a scene in this mayapy session and return its playback range and frame rate."""
+    cmds = _open_scene(scene_path)
+    return {
+        'start': int(round(cmds.playbackOptions(query=True, minTime=True))),
+        'end': int(round(cmds.playbackOptions(query=True, maxTime=True))),
+        'frame_rate': get_frame_rate(cmds.currentUnit(query=True, time=True)),
+    }
+
+def capture_scene(scene_path, frames_dir, name, width=None, height=None, camera=None,
+                  start=None, end=None):
+    """Open a scene in this mayapy session and playblast it off-screen."""
+    cmds = _open_scene(scene_path)
+
+    camera = camera or _find_render_camera(cmds)
+    if not cmds.objExists(camera):
+        raise RuntimeError(f"Camera '{camera}' does not exist in the scene.")
+    try:
+        cmds.lookThru(camera)
+    except RuntimeError as e:
+        print(f"Could not look through {camera}: {e}")
+
+    if start is None:
+        start = cmds.playbackOptions(query=True, minTime=True)
+    if end is None:
+        end = cmds.playbackOptions(query=True, maxTime=True)
+    width = width or cmds.getAttr("defaultResolution.width")
+    height = height or cmds.getAttr("defaultResolution.height")
+
+    if not os.path.exists(frames_dir):
+        os.makedirs(frames_dir)
+
+    cmds.playblast(
+        filename=os.path.join(frames_dir, name),
+        format='image',
+        startTime=start,
+        endTime=end,
+        sequenceTime=0,
+        clearCache=1,
+        viewer=0,
+        showOrnaments=0,
+        fp=4,
+        percent=100,
+        compression='jpg',
+        quality=100,
+        widthHeight=[width, height],
+        offScreen=True,
+        framePadding=4
+    )
+
+    return {
+        'camera': camera,
+        'start': int(round(start)),
+        'end': int(round(end)),
+        'frame_rate': get_frame_rate(cmds.currentUnit(query=True, time=True)),
+    }
+
+def main(argv=None):
+    """Entry point run by MayapyCapture inside mayapy."""
+    parser = argparse.ArgumentParser(description="Playblast one scene off-screen (run with mayapy).")
+    parser.add_argument('scene')
+    parser.add_argument('frames_dir', nargs='?')
+    parser.add_argument('name', nargs='?')
+    parser.add_argument('--info', action='store_true', help="Only report the scene's frame range.")
+    parser.add_argument('--width', type=int)
+    parser.add_argument('--height', type=int)
+    parser.add_argument('--camera')
+    parser.add_argument('--start', type=float)
+    parser.add_argument('--end', type=float)
+    args = parser.parse_args(argv)
+
+    if args.info:
+        result = read_scene_info(args.scene)
+    elif args.frames_dir and args.name:
+        result = capture_scene(args.scene, args.frames_dir, args.name, args.width, args.height,
+                               args.camera, args.start, args.end)
+    else:
+        parser.error("frames_dir and name are required unless --info is given")
+    print(RESULT_PREFIX + json.dumps(result))
+    sys.stdout.flush()
+
+    import maya.standalone
+    maya.standalone.uninitialize()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
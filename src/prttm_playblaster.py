@@ -1,7 +1,14 @@
 import os
 import json
+import time
+import shutil
+import tempfile
+import functools
 import subprocess
-import webbrowser
+import frame_utils
+import ffmpeg_utils
+import publish_queue
+import playblast_utils
 import shotgrid_utils
 from PySide2 import QtWidgets, QtCore
 from shiboken2 import wrapInstance
@@ -20,12 +27,15 @@ class PlayblastUI(QtWidgets.QDialog):
         self.setMinimumHeight(200)
         self.setWindowFlags(self.windowFlags() ^ QtCore.Qt.WindowContextHelpButtonHint)
 
+        self.publish_queue = publish_queue.get_publish_queue()
+
         self.create_widgets()
         self.create_layouts()
         self.create_connections()
 
         self.load_render_settings()
         self.load_ffmpeg_path()
+        self.load_encode_settings()
 
     def create_widgets(self):
         self.camera_label = QtWidgets.QLabel("Camera:")
@@ -49,11 +59,44 @@ class PlayblastUI(QtWidgets.QDialog):
         self.ffmpeg_line_edit = QtWidgets.QLineEdit()
         self.browse_button = QtWidgets.QPushButton("Browse")
 
+        self.profile_label = QtWidgets.QLabel("Encode Profile:")
+        self.profile_combo = QtWidgets.QComboBox()
+        self.profile_combo.setToolTip(
+            "FFmpeg settings used for the movie, edit or add profiles in AnimationPublisher.json."
+        )
+
+        self.threads_label = QtWidgets.QLabel("Encode Threads:")
+        self.threads_spin = QtWidgets.QSpinBox()
+        self.threads_spin.setRange(1, os.cpu_count() or 1)
+        self.threads_spin.setToolTip("Maximum CPU threads FFmpeg may use, so encodes don't slow Maya down.")
+
+        self.renditions_check = QtWidgets.QCheckBox("Also encode editorial and mobile renditions")
+        self.renditions_check.setToolTip(
+            "Encode the renditions listed in AnimationPublisher.json in the same FFmpeg pass as the movie."
+        )
+
+        self.stream_check = QtWidgets.QCheckBox("Stream frames to FFmpeg (no frame files)")
+        self.stream_check.setToolTip(
+            "Pipe each captured frame straight into FFmpeg instead of writing a JPEG sequence."
+        )
+
+        self.incremental_check = QtWidgets.QCheckBox("Only re-capture changed frames")
+        self.incremental_check.setToolTip(
+            "Keep the previous frames and only playblast the changed frames before re-encoding."
+        )
+        self.changed_frames_label = QtWidgets.QLabel("Changed Frames:")
+        self.changed_frames_line_edit = QtWidgets.QLineEdit()
+        self.changed_frames_line_edit.setPlaceholderText("e.g. 40-60, 100 (empty: detect from animation)")
+        self.changed_frames_line_edit.setEnabled(False)
+
         self.warning_label = QtWidgets.QLabel(
             "Warning: Disable film and resolution gates manually."
         )
         self.warning_label.setStyleSheet("color: red;")
 
+        self.status_label = QtWidgets.QLabel("")
+        self.status_label.setWordWrap(True)
+
         self.submit_button = QtWidgets.QPushButton("Submit")
         self.cancel_button = QtWidgets.QPushButton("Cancel")
 
@@ -69,7 +112,14 @@ class PlayblastUI(QtWidgets.QDialog):
         form_layout.addRow(self.height_label, self.height_spin)
         form_layout.addRow(self.ffmpeg_label, self.ffmpeg_line_edit)
         form_layout.addRow(self.browse_button)
+        form_layout.addRow(self.profile_label, self.profile_combo)
+        form_layout.addRow(self.threads_label, self.threads_spin)
+        form_layout.addRow(self.renditions_check)
+        form_layout.addRow(self.stream_check)
+        form_layout.addRow(self.incremental_check)
+        form_layout.addRow(self.changed_frames_label, self.changed_frames_line_edit)
         form_layout.addRow(self.warning_label)
+        form_layout.addRow(self.status_label)
 
         button_layout = QtWidgets.QHBoxLayout()
         button_layout.addStretch()
@@ -85,8 +135,17 @@ class PlayblastUI(QtWidgets.QDialog):
         self.cancel_button.clicked.connect(self.reject)
         self.browse_button.clicked.connect(self.browse_ffmpeg_path)
         self.ffmpeg_line_edit.textChanged.connect(self.save_ffmpeg_path)
+        self.profile_combo.currentIndexChanged.connect(self.save_encode_settings)
+        self.threads_spin.valueChanged.connect(self.save_encode_settings)
+        self.renditions_check.toggled.connect(self.save_encode_settings)
         self.viewport_combo.currentIndexChanged.connect(self.update_camera_list)
         self.renderer_combo.currentIndexChanged.connect(self.update_render_settings)
+        self.incremental_check.toggled.connect(self.update_incremental_options)
+        self.stream_check.toggled.connect(self.update_incremental_options)
+        self.publish_queue.job_started.connect(self.on_publish_started)
+        self.publish_queue.job_progress.connect(self.on_publish_progress)
+        self.publish_queue.job_finished.connect(self.on_publish_finished)
+        self.publish_queue.job_failed.connect(self.on_publish_failed)
 
     def load_viewports(self):
         self.viewport_combo.clear()
@@ -134,6 +193,12 @@ class PlayblastUI(QtWidgets.QDialog):
         # This method might not be necessary for viewport renderers
         pass
 
+    def update_incremental_options(self):
+        # Streaming writes no frame files, so there is nothing to update incrementally
+        self.incremental_check.setEnabled(not self.stream_check.isChecked())
+        incremental = self.incremental_check.isEnabled() and self.incremental_check.isChecked()
+        self.changed_frames_line_edit.setEnabled(incremental)
+
     def load_render_settings(self):
         render_width = cmds.getAttr("defaultResolution.width")
         render_height = cmds.getAttr("defaultResolution.height")
@@ -141,12 +206,34 @@ class PlayblastUI(QtWidgets.QDialog):
         self.height_spin.setValue(render_height)
 
     def load_ffmpeg_path(self):
-        config_path = self.get_config_path()
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-                ffmpeg_path = config.get('ffmpeg_path', '')
-                self.ffmpeg_line_edit.setText(ffmpeg_path)
+        config = self.load_config()
+        ffmpeg_path = config.get('ffmpeg_path', '')
+        self.ffmpeg_line_edit.setText(ffmpeg_path)
+
+    def load_encode_settings(self):
+        config = self.load_config()
+        # Written out once so the profiles and renditions can be edited in the config file
+        defaults = {'encode_profiles': ffmpeg_utils.ENCODE_PROFILES, 'renditions': ffmpeg_utils.RENDITIONS}
+        missing = {key: value for key, value in defaults.items() if key not in config}
+        if missing:
+            self.save_config(**missing)
+        self.encode_profiles = ffmpeg_utils.get_encode_profiles(config.get('encode_profiles'))
+        self.renditions = config.get('renditions', ffmpeg_utils.RENDITIONS)
+
+        # Signals are blocked so filling in the widgets doesn't save them straight back
+        self.profile_combo.blockSignals(True)
+        self.threads_spin.blockSignals(True)
+        self.renditions_check.blockSignals(True)
+        self.profile_combo.clear()
+        self.profile_combo.addItems(sorted(self.encode_profiles))
+        index = self.profile_combo.findText(config.get('encode_profile', ffmpeg_utils.DEFAULT_ENCODE_PROFILE))
+        if index >= 0:
+            self.profile_combo.setCurrentIndex(index)
+        self.threads_spin.setValue(config.get('encode_threads', ffmpeg_utils.get_default_encode_threads()))
+        self.renditions_check.setChecked(config.get('encode_renditions', False))
+        self.profile_combo.blockSignals(False)
+        self.threads_spin.blockSignals(False)
+        self.renditions_check.blockSignals(False)
 
     def browse_ffmpeg_path(self):
         ffmpeg_path, _ = QtWidgets.QFileDialog.getOpenFileName(self, "Select FFmpeg Executable")
@@ -156,10 +243,42 @@ class PlayblastUI(QtWidgets.QDialog):
     def save_ffmpeg_path(self):
         ffmpeg_path = self.ffmpeg_line_edit.text()
         if os.path.exists(ffmpeg_path) and os.path.isfile(ffmpeg_path):
-            config_path = self.get_config_path()
-            os.makedirs(os.path.dirname(config_path), exist_ok=True)
-            with open(config_path, 'w') as f:
-                json.dump({'ffmpeg_path': ffmpeg_path}, f)
+            self.save_config(ffmpeg_path=ffmpeg_path)
+
+    def save_encode_settings(self):
+        self.save_config(
+            encode_profile=self.profile_combo.currentText(),
+            encode_threads=self.threads_spin.value(),
+            encode_renditions=self.renditions_check.isChecked()
+        )
+
+    def get_encode_profile(self):
+        return self.encode_profiles.get(self.profile_combo.currentText())
+
+    def get_rendition_outputs(self, mp4_output_path):
+        if not self.renditions_check.isChecked():
+            return []
+        try:
+            return ffmpeg_utils.get_rendition_outputs(mp4_output_path, self.renditions, self.encode_profiles)
+        except KeyError as e:
+            cmds.warning(f"Rendition uses unknown encode profile {e}, skipping renditions.")
+            return []
+
+    def load_config(self):
+        config_path = self.get_config_path()
+        if os.path.exists(config_path):
+            with open(config_path, 'r') as f:
+                return json.load(f)
+        return {}
+
+    def save_config(self, **values):
+        # Merged into the existing config so saving one setting keeps the others
+        config = self.load_config()
+        config.update(values)
+        config_path = self.get_config_path()
+        os.makedirs(os.path.dirname(config_path), exist_ok=True)
+        with open(config_path, 'w') as f:
+            json.dump(config, f, indent=4)
 
     def get_config_path(self):
         user_dir = os.path.expanduser("~")
@@ -175,11 +294,32 @@ class PlayblastUI(QtWidgets.QDialog):
         )
 
         if reply == QtWidgets.QMessageBox.Yes:
+            # The dialog stays open so it can show publish progress while the
+            # encode and upload run in the background.
             self.export_image_sequence()
-            self.accept()
         else:
             self.reject()
 
+    def on_publish_started(self, short_name):
+        self.set_status(f"{short_name}: started")
+
+    def on_publish_progress(self, short_name, message):
+        self.set_status(f"{short_name}: {message}")
+
+    def on_publish_finished(self, short_name, version_url):
+        self.set_status(f"{short_name}: published {version_url}")
+
+    def on_publish_failed(self, short_name, error):
+        self.set_status(f"{short_name}: failed - {error}")
+        cmds.warning(f"Publish failed for {short_name}: {error}")
+
+    def set_status(self, message):
+        pending = self.publish_queue.pending_count()
+        if pending > 1:
+            message += f" ({pending - 1} more queued)"
+        self.status_label.setText(message)
+        print(message)
+
     def export_image_sequence(self):
         file_path = cmds.file(query=True, sceneName=True)
         
@@ -187,16 +327,14 @@ class PlayblastUI(QtWidgets.QDialog):
             cmds.error("Please save your scene before running the script.")
             return
 
-        file_dir = os.path.dirname(file_path)
-        base_name = os.path.basename(file_path)
-        name, ext = os.path.splitext(base_name)
+        name, ext, output_dir, frames_dir = playblast_utils.get_playblast_paths(file_path)
+        # A new capture would change the frames and movie the queued job is working on
+        if self.publish_queue.is_in_flight(os.path.join(output_dir, name + ".mp4")):
+            cmds.error(f"{name} is still being encoded or uploaded. Submit it again once it has been published.")
+            return
 
-        output_dir = file_dir.replace('/tasks/', '/outputs/')
-        output_dir = os.path.join(output_dir, name, 'playblast')
-        frames_dir = os.path.join(output_dir, 'frames')
-        output_dir = os.path.normpath(output_dir)
-        frames_dir = os.path.normpath(frames_dir)
-        if not os.path.exists(frames_dir):
+        stream_frames = self.stream_check.isChecked()
+        if not stream_frames and not os.path.exists(frames_dir):
             os.makedirs(frames_dir)
 
         output_pattern = os.path.join(frames_dir, name)
@@ -248,35 +386,170 @@ class PlayblastUI(QtWidgets.QDialog):
         except Exception as e:
             cmds.warning(f"Failed to set up viewport {selected_viewport}: {str(e)}. Using default viewport settings.")
 
+        if stream_frames:
+            self.stream_to_mp4(output_dir, name, ext, start_frame, end_frame, render_width, render_height)
+            return
+
+        # Taken before the playblast so edits made while it runs show up next time
+        anim_snapshot = playblast_utils.snapshot_anim_curves(cmds)
+
+        first_frame, last_frame = int(round(start_frame)), int(round(end_frame))
+        captured_frames = list(range(first_frame, last_frame + 1))
+        frame_args = {'startTime': start_frame, 'endTime': end_frame}
+        if self.incremental_check.isChecked():
+            try:
+                changed_frames = self.get_changed_frames(
+                    output_dir, frames_dir, name, start_frame, end_frame, anim_snapshot
+                )
+            except ValueError as e:
+                cmds.error(str(e))
+                return
+            if changed_frames is not None:
+                captured_frames = changed_frames
+                frame_args = {'frame': changed_frames}
+                print("Capturing changed frames: {}".format(
+                    frame_utils.format_frame_ranges(frame_utils.frames_to_ranges(changed_frames)) or "none"
+                ))
+
+        # Frames left over from a longer take would end up in the movie, and frames
+        # about to be re-captured are removed so a failed capture can't leave old ones.
+        sequence = frame_utils.scan_frame_sequence(frames_dir, name)
+        stale_frames = sequence.stale_frames(first_frame, last_frame)
+        if stale_frames:
+            print("Removing {} frames outside {}-{}.".format(len(stale_frames), first_frame, last_frame))
+        frame_utils.remove_frames(sequence, stale_frames + captured_frames)
+
         # Perform the playblast
+        capture_time = time.time()
         try:
-            cmds.playblast(
-                filename=output_pattern,
-                format='image',
-                startTime=start_frame,
-                endTime=end_frame,
-                sequenceTime=0,
-                clearCache=1,
-                viewer=0,
-                showOrnaments=0,
-                fp=4,
-                percent=100,
-                compression='jpg',
-                quality=100,
-                widthHeight=[render_width, render_height],
-                offScreen=True,
-                framePadding=4
-            )
+            if captured_frames:
+                self.playblast_frames(output_pattern, frame_args, render_width, render_height)
         except Exception as e:
             cmds.error(f"Playblast failed: {str(e)}")
             return
+        finally:
+            frame_utils.invalidate_frame_sequence(frames_dir)
 
+        sequence = frame_utils.scan_frame_sequence(frames_dir, name)
+        problems = frame_utils.find_sequence_problems(
+            sequence, first_frame, last_frame, captured_frames, capture_time
+        )
+        if problems:
+            cmds.error("Playblast is incomplete, not publishing it: {}.".format(", ".join(problems)))
+            return
+
+        frame_utils.save_anim_snapshot(self.get_anim_snapshot_path(output_dir), anim_snapshot)
         self.convert_to_mp4(output_dir, frames_dir, name, ext)
 
+    def playblast_frames(self, output_pattern, frame_args, render_width, render_height):
+        cmds.playblast(
+            filename=output_pattern,
+            format='image',
+            sequenceTime=0,
+            clearCache=1,
+            viewer=0,
+            showOrnaments=0,
+            fp=4,
+            percent=100,
+            compression='jpg',
+            quality=100,
+            widthHeight=[render_width, render_height],
+            offScreen=True,
+            framePadding=4,
+            **frame_args
+        )
+
+    def get_anim_snapshot_path(self, output_dir):
+        return os.path.join(output_dir, 'anim_snapshot.json')
+
+    def get_changed_frames(self, output_dir, frames_dir, base_name, start_frame, end_frame, anim_snapshot):
+        """Return the frames to re-capture, or None when everything has to be captured.
+
+        Uses the ranges typed by the user, or else the animation curves that changed
+        since the last capture. Frames missing from frames_dir are always included.
+        """
+        start_frame, end_frame = int(round(start_frame)), int(round(end_frame))
+        ranges_text = self.changed_frames_line_edit.text().strip()
+        if ranges_text:
+            ranges = frame_utils.parse_frame_ranges(ranges_text)
+        else:
+            previous_snapshot = frame_utils.load_anim_snapshot(self.get_anim_snapshot_path(output_dir))
+            if previous_snapshot is None:
+                print("No animation snapshot from a previous capture, capturing every frame.")
+                return None
+            ranges = frame_utils.diff_anim_snapshots(previous_snapshot, anim_snapshot)
+
+        changed_frames = frame_utils.frames_in_ranges(frame_utils.clip_frame_ranges(ranges, start_frame, end_frame))
+        sequence = frame_utils.scan_frame_sequence(frames_dir, base_name)
+        return sorted(set(changed_frames) | set(sequence.missing_frames(start_frame, end_frame)))
+
+    def stream_to_mp4(self, output_dir, base_name, ext, start_frame, end_frame, render_width, render_height):
+        ffmpeg_path = self.get_ffmpeg_path()
+        if not ffmpeg_path:
+            return
+
+        frame_rate = self.get_frame_rate()
+        if frame_rate <= 0:
+            cmds.error("Invalid frame rate.")
+            return
+
+        mp4_output_path = os.path.join(output_dir, base_name + ".mp4")
+        if not self.confirm_overwrite(mp4_output_path):
+            return
+        os.makedirs(output_dir, exist_ok=True)
+
+        # Each frame is captured to a local temp file, piped to FFmpeg and then
+        # overwritten by the next one, so nothing is written to the shared drive
+        # until the finished movie.
+        temp_dir = tempfile.mkdtemp(prefix="prttm_playblast_")
+        frame_path = os.path.join(temp_dir, base_name + ".png")
+        frames = range(int(round(start_frame)), int(round(end_frame)) + 1)
+        preview_frames = set(ffmpeg_utils.sample_frames(frames))
+        preview_paths = []
+        encoder = ffmpeg_utils.FFmpegStreamEncoder(
+            ffmpeg_path, mp4_output_path, frame_rate, self.get_encode_profile(), self.threads_spin.value(),
+            self.get_rendition_outputs(mp4_output_path)
+        )
+        try:
+            for frame in frames:
+                cmds.playblast(
+                    completeFilename=frame_path,
+                    format='image',
+                    frame=[frame],
+                    clearCache=1,
+                    viewer=0,
+                    showOrnaments=0,
+                    percent=100,
+                    compression='png',
+                    quality=100,
+                    widthHeight=[render_width, render_height],
+                    offScreen=True
+                )
+                encoder.write_frame_file(frame_path)
+                if frame in preview_frames:
+                    # Kept for the thumbnail and filmstrip
+                    preview_paths.append(os.path.join(temp_dir, f"preview.{frame:04d}.png"))
+                    shutil.copyfile(frame_path, preview_paths[-1])
+            encoder.close()
+            previews = ffmpeg_utils.try_build_previews(ffmpeg_path, preview_paths, output_dir, base_name,
+                                                       warn=cmds.warning)
+        except subprocess.CalledProcessError as e:
+            encoder.abort()
+            cmds.error("FFmpeg failed with error: {}".format(e))
+            return
+        except Exception as e:
+            encoder.abort()
+            cmds.error(f"Playblast failed: {str(e)}")
+            return
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+        print("Streamed {} frames to {}".format(encoder.frame_count, mp4_output_path))
+        self.publish_queue.submit(publish_queue.PublishJob(base_name + ext, mp4_output_path, previews=previews))
+
     def convert_to_mp4(self, output_dir, frames_dir, base_name, ext):
-        ffmpeg_path = self.ffmpeg_line_edit.text()
-        if not os.path.exists(ffmpeg_path) or not os.path.isfile(ffmpeg_path):
-            cmds.error("Invalid FFmpeg path.")
+        ffmpeg_path = self.get_ffmpeg_path()
+        if not ffmpeg_path:
             return
 
         frame_rate = self.get_frame_rate()
@@ -285,7 +558,54 @@ class PlayblastUI(QtWidgets.QDialog):
             return
 
         mp4_output_path = os.path.join(output_dir, base_name + ".mp4")
+        if not self.confirm_overwrite(mp4_output_path):
+            return
+
+        # Scanned once here and reused by the encode on the publish queue
+        sequence = frame_utils.scan_frame_sequence(frames_dir, base_name)
+        if sequence.first_frame is None:
+            cmds.error("No frames found in the specified directory.")
+            return
 
+        # Only the playback range is encoded, so frames outside it never reach the movie.
+        # Only the segments whose frames changed since the last encode are encoded again.
+        first_frame = int(round(cmds.playbackOptions(query=True, minTime=True)))
+        last_frame = int(round(cmds.playbackOptions(query=True, maxTime=True)))
+        segmented_encode = ffmpeg_utils.SegmentedEncode(
+            ffmpeg_path,
+            sequence,
+            first_frame,
+            last_frame,
+            frame_rate,
+            mp4_output_path,
+            os.path.join(output_dir, 'frame_manifest.json'),
+            profile=self.get_encode_profile(),
+            threads=self.threads_spin.value(),
+            extra_outputs=self.get_rendition_outputs(mp4_output_path)
+        )
+
+        preview_paths = [sequence.frame_path(frame)
+                         for frame in ffmpeg_utils.sample_frames(range(first_frame, last_frame + 1))]
+        # Runs on the publish queue thread, so failures are printed rather than sent to cmds.warning
+        build_previews = functools.partial(ffmpeg_utils.try_build_previews, ffmpeg_path, preview_paths,
+                                           output_dir, base_name)
+
+        # Encoding, previews and upload happen on the publish queue so Maya stays usable.
+        self.publish_queue.submit(publish_queue.PublishJob(
+            base_name + ext,
+            mp4_output_path,
+            segmented_encode=segmented_encode,
+            build_previews=build_previews
+        ))
+
+    def get_ffmpeg_path(self):
+        ffmpeg_path = self.ffmpeg_line_edit.text()
+        if not os.path.exists(ffmpeg_path) or not os.path.isfile(ffmpeg_path):
+            cmds.error("Invalid FFmpeg path.")
+            return None
+        return ffmpeg_path
+
+    def confirm_overwrite(self, mp4_output_path):
         if os.path.exists(mp4_output_path):
             reply = QtWidgets.QMessageBox.question(
                 self,
@@ -294,58 +614,14 @@ class PlayblastUI(QtWidgets.QDialog):
                 QtWidgets.QMessageBox.Yes | QtWidgets.QMessageBox.No,
             )
             if reply == QtWidgets.QMessageBox.No:
-                return
+                return False
             else:
                 os.remove(mp4_output_path)
-
-        first_frame = self.get_first_frame_number(frames_dir, base_name)
-        if first_frame is None:
-            cmds.error("No frames found in the specified directory.")
-            return
-
-        ffmpeg_command = [
-            ffmpeg_path,
-            '-framerate', str(frame_rate),
-            '-start_number', str(first_frame),
-            '-i', os.path.join(frames_dir, base_name + ".%04d.jpg"),
-            '-c:v', 'libx264',
-            '-pix_fmt', 'yuv420p',
-            mp4_output_path
-        ]
-
-        print("FFmpeg Command: {}".format(" ".join(ffmpeg_command)))
-        try:
-            subprocess.run(ffmpeg_command, check=True)
-            self.open_mp4(mp4_output_path)
-            self.upload_to_shotgrid(base_name + ext, proxy=mp4_output_path)
-        except subprocess.CalledProcessError as e:
-            cmds.error("FFmpeg failed with error: {}".format(e))
+        return True
 
     def get_frame_rate(self):
         time_unit = cmds.currentUnit(query=True, time=True)
-        frame_rates = {
-            'game': 15.0,
-            'film': 24.0,
-            'pal': 25.0,
-            'ntsc': 30.0,
-            'show': 48.0,
-            'palf': 50.0,
-            'ntscf': 60.0,
-        }
-        return frame_rates.get(time_unit, 0.0)
-
-    def get_first_frame_number(self, frames_dir, base_name):
-        files = os.listdir(frames_dir)
-        frames = sorted([int(f.split('.')[-2]) for f in files if f.startswith(base_name) and f.endswith('.jpg')])
-        return frames[0] if frames else None
-
-    def open_mp4(self, mp4_path):
-        webbrowser.open(mp4_path)
-
-    def upload_to_shotgrid(self, short_name, proxy):
-        # Use shotgrid_utils to upload the version with proxy path
-        shotgrid_utils.update_version(short_name, proxy=proxy)
-        print("uploading")
+        return playblast_utils.get_frame_rate(time_unit)
 
 # Example usage
 if __name__ == "__main__":
@@ -0,0 +1,154 @@
+import os
+import queue
+import subprocess
+import threading
+import webbrowser
+import shotgrid_utils
+from PySide2 import QtCore
+
+class PublishJob(object):
+    """A finished capture waiting to be encoded, reviewed and uploaded to ShotGrid."""
+
+    def __init__(self, short_name, mp4_path, open_movie=True, segmented_encode=None, previews=None,
+                 build_previews=None):
+        self.short_name = short_name
+        self.mp4_path = mp4_path
+        self.segmented_encode = segmented_encode
+        self.previews = previews
+        # Called on the queue thread to make the previews, returning what goes in previews
+        self.build_previews = build_previews
+        # Set by the segmented encode once it knows how many frames it will encode
+        self.frame_count = 0
+        self.open_movie = open_movie
+
+class PublishQueue(QtCore.QObject):
+    """Runs publish jobs one after another on a background thread.
+
+    Progress is reported through Qt signals, which are delivered on the UI thread,
+    so connected widgets can be updated directly from the slots.
+    """
+
+    job_started = QtCore.Signal(str)
+    job_progress = QtCore.Signal(str, str)
+    job_finished = QtCore.Signal(str, str)
+    job_failed = QtCore.Signal(str, str)
+
+    def __init__(self, parent=None):
+        super(PublishQueue, self).__init__(parent)
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        # Movies of the jobs queued or running, whose frames and outputs must not change
+        self._in_flight = set()
+
+    def is_in_flight(self, mp4_path):
+        """Return True while a job for mp4_path is queued or running."""
+        with self._lock:
+            return os.path.normpath(mp4_path) in self._in_flight
+
+    def submit(self, job):
+        """Queue a job and make sure the worker thread is running.
+
+        Raises RuntimeError if a job for the same movie is still queued or running,
+        as the new capture would change the frames that job is encoding.
+        """
+        with self._lock:
+            mp4_path = os.path.normpath(job.mp4_path)
+            if mp4_path in self._in_flight:
+                raise RuntimeError(f"'{job.short_name}' is still being published.")
+            self._in_flight.add(mp4_path)
+        self._jobs.put(job)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="PublishQueue")
+                self._thread.daemon = True
+                self._thread.start()
+
+    def pending_count(self):
+        """Return the number of jobs that have not finished yet."""
+        return self._jobs.unfinished_tasks
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            error = None
+            try:
+                self.job_started.emit(job.short_name)
+                version_url = self._publish(job)
+            except Exception as e:
+                error = e
+            # Released before the signals so the shot can be submitted again from them
+            with self._lock:
+                self._in_flight.discard(os.path.normpath(job.mp4_path))
+            try:
+                if error is None:
+                    self.job_finished.emit(job.short_name, version_url or "")
+                else:
+                    self.job_failed.emit(job.short_name, str(error))
+            finally:
+                self._jobs.task_done()
+
+    def _publish(self, job):
+        if job.segmented_encode:
+            self._encode_segments(job)
+
+        if job.build_previews:
+            self._build_previews(job)
+
+        if job.open_movie:
+            webbrowser.open(job.mp4_path)
+
+        self.job_progress.emit(job.short_name, "Uploading to ShotGrid")
+        version_url = shotgrid_utils.update_version(job.short_name, proxy=job.mp4_path, previews=job.previews)
+        if not version_url:
+            raise RuntimeError(f"ShotGrid publish failed for '{job.short_name}'.")
+        return version_url
+
+    def _build_previews(self, job):
+        self.job_progress.emit(job.short_name, "Making thumbnail and filmstrip")
+        job.previews = job.build_previews()
+
+    def _encode_segments(self, job):
+        encode = job.segmented_encode
+        self.job_progress.emit(job.short_name, "Checking frames for changes")
+        encode.prepare()
+        job.frame_count = encode.frame_count
+        self.job_progress.emit(job.short_name, "Encoding {} of {} segments ({} unchanged)".format(
+            len(encode.commands), encode.segment_count, encode.reused_count
+        ))
+        frames_done = 0
+        for command in encode.commands:
+            frames_done += self._encode(job, command, frames_done)
+        self.job_progress.emit(job.short_name, "Joining segments")
+        encode.finish()
+
+    def _encode(self, job, command, frames_done=0):
+        """Run an FFmpeg command, reporting progress, and return the number of frames it encoded."""
+        command = list(command)
+        # Ask FFmpeg for machine readable progress on stdout.
+        command[1:1] = ['-nostats', '-progress', 'pipe:1']
+        print("FFmpeg Command: {}".format(" ".join(command)))
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, universal_newlines=True)
+        frames_encoded = 0
+        for line in process.stdout:
+            key, _, value = line.strip().partition('=')
+            if key == 'frame':
+                frames_encoded = int(value)
+                if job.frame_count:
+                    message = f"Encoding frame {frames_done + frames_encoded}/{job.frame_count}"
+                else:
+                    message = f"Encoding frame {frames_done + frames_encoded}"
+                self.job_progress.emit(job.short_name, message)
+        return_code = process.wait()
+        if return_code != 0:
+            raise subprocess.CalledProcessError(return_code, command)
+        return frames_encoded
+
+_publish_queue = None
+
+def get_publish_queue():
+    """Return the shared publish queue, which outlives any single PlayblastUI."""
+    global _publish_queue
+    if _publish_queue is None:
+        _publish_queue = PublishQueue()
+    return _publish_queue
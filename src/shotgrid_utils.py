@@ -1,5 +1,8 @@
 import os
 import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import shotgun_api3
 from shotgun_api3 import Shotgun
 import webbrowser
@@ -23,8 +26,11 @@ input_name, input_key = load_encrypted_credentials(credentials_filename)
 # Connect to ShotGrid
 SHOTGRID_URL = 'https://prttm.shotgrid.autodesk.com'
 sg = Shotgun(SHOTGRID_URL, input_name, input_key)
+# Resume interrupted playblast uploads instead of restarting them from scratch
+sg.config.resumable_uploads = True
 
 PROJECT_ID = 222  # Hardcoded project ID
+PUBLISH_UPLOAD_WORKERS = 3  # Movies uploaded at the same time by publish_many
 
 def parse_filename(filename):
     """Parse the Maya file short name to extract project details."""
@@ -42,55 +48,319 @@ def create_entity(entity_type, data):
     """Create a new entity in ShotGrid."""
     return sg.create(entity_type, data)
 
-def update_version(short_name, proxy=None):
-    """Update or create a version in ShotGrid based on the parsed filename."""
+################################################################################
+# Entity Cache
+################################################################################
+# Shot and Task ids rarely change, so they are cached between publishes. Set
+# ENTITY_CACHE_PATH to None to keep the cache in memory only.
+ENTITY_CACHE_PATH = os.path.join(os.path.expanduser("~"), '.prttm', 'AnimationPublisher', 'entity_cache.json')
+ENTITY_CACHE_TTL = 24 * 60 * 60  # Seconds before a cached id is looked up again
+
+_entity_cache = None
+_entity_cache_lock = threading.Lock()
+
+def _load_entity_cache():
+    global _entity_cache
+    if _entity_cache is None:
+        _entity_cache = {}
+        if ENTITY_CACHE_PATH and os.path.exists(ENTITY_CACHE_PATH):
+            try:
+                with open(ENTITY_CACHE_PATH, 'r') as f:
+                    _entity_cache = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Ignoring unreadable entity cache {ENTITY_CACHE_PATH}: {e}")
+    return _entity_cache
+
+def _save_entity_cache():
+    if not ENTITY_CACHE_PATH:
+        return
+    try:
+        os.makedirs(os.path.dirname(ENTITY_CACHE_PATH), exist_ok=True)
+        tmp_path = ENTITY_CACHE_PATH + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(_entity_cache, f)
+        os.replace(tmp_path, ENTITY_CACHE_PATH)
+    except OSError as e:
+        print(f"Could not save entity cache {ENTITY_CACHE_PATH}: {e}")
+
+def entity_cache_key(*parts):
+    """Build a cache key from the project and the names identifying an entity."""
+    return "/".join(str(part) for part in (PROJECT_ID,) + parts)
+
+def get_cached_entity(key):
+    """Return the cached {'type', 'id'} entity for key, or None if missing or expired."""
+    with _entity_cache_lock:
+        cached = _load_entity_cache().get(key)
+        if not cached:
+            return None
+        if time.time() - cached['time'] > ENTITY_CACHE_TTL:
+            del _entity_cache[key]
+            return None
+        return cached['entity']
+
+def cache_entity(key, entity, save=True):
+    """Store the type and id of an entity under key.
+
+    Pass save=False when caching many entities, then call save_entity_cache once.
+    """
+    with _entity_cache_lock:
+        _load_entity_cache()[key] = {
+            'entity': {'type': entity['type'], 'id': entity['id']},
+            'time': time.time()
+        }
+        if save:
+            _save_entity_cache()
+
+def save_entity_cache():
+    """Write the cached entities to ENTITY_CACHE_PATH."""
+    with _entity_cache_lock:
+        _load_entity_cache()
+        _save_entity_cache()
+
+def invalidate_cached_entity(*keys):
+    """Forget cached entities, e.g. when a cached id turned out to be stale."""
+    with _entity_cache_lock:
+        cache = _load_entity_cache()
+        for key in keys:
+            cache.pop(key, None)
+        _save_entity_cache()
+
+################################################################################
+# Publishing
+################################################################################
+def _entity_link(entity):
+    """Strip an entity dict down to the type and id needed to link to it."""
+    return {'type': entity['type'], 'id': entity['id']}
+
+def _find_linked(entities, name):
+    """Return the linked entity called name from a multi-entity field value."""
+    for entity in entities or []:
+        if entity.get('name') == name:
+            return _entity_link(entity)
+    return None
+
+def batch_create(entity_type, data_list):
+    """Create several entities of one type in a single round trip."""
+    requests = [{'request_type': 'create', 'entity_type': entity_type, 'data': data} for data in data_list]
+    return [_entity_link(entity) for entity in sg.batch(requests)]
+
+def _new_publish(short_name, proxy, previews=None):
+    """Describe one publish request, parsing the shot, task and version from its name."""
+    publish = {'short_name': short_name, 'proxy': proxy, 'previews': previews or {}, 'shot': None,
+               'task': None, 'version': None, 'url': None, 'error': None}
     try:
         data = parse_filename(short_name)
     except ValueError as e:
         print(f"Error parsing filename: {e}")
-        return
+        publish['error'] = e
+        return publish
+    publish['shot_code'] = f"{data['sequence']}_{data['shot']}"
+    publish['task_name'] = data['task']
+    publish['version_code'] = f"{short_name.split('.')[0]}"
+    return publish
+
+def resolve_entities(publishes, use_cache=True):
+    """Find the Shots, Tasks and Versions of many publishes with at most two queries.
+
+    Versions are looked up by code across the site whether or not the shot is cached,
+    in a query sent alongside the Shot query. Sets 'shot', 'task' and 'version' on
+    every publish, leaving None for entities that don't exist yet.
+    """
+    uncached_shots = set()
+    for publish in publishes:
+        shot_code = publish['shot_code']
+        if use_cache:
+            publish['shot'] = get_cached_entity(entity_cache_key(shot_code))
+            publish['task'] = get_cached_entity(entity_cache_key(shot_code, publish['task_name']))
+        else:
+            publish['shot'] = publish['task'] = None
+        publish['version'] = None
+        if not (publish['shot'] and publish['task']):
+            uncached_shots.add(shot_code)
 
-    sequence = data['sequence']
-    shot = data['shot']
-    task_name = data['task']
-    version_number = int(data['version'])
-
-    # Check if the shot exists
-    shot_code = f"{sequence}_{shot}"
-    shot_entity = get_entity('Shot', [['code', 'is', shot_code]])
-    if not shot_entity:
-        print(f"Shot '{shot_code}' not found. Creating new shot.")
-        shot_entity = create_entity('Shot', {'code': shot_code, 'project': {'type': 'Project', 'id': PROJECT_ID}})
-
-    # Check if the task exists
-    task_entity = get_entity('Task', [['entity', 'is', shot_entity], ['content', 'is', task_name]])
-    if not task_entity:
-        print(f"Task '{task_name}' not found. Creating new task.")
-        task_entity = create_entity('Task', {'entity': shot_entity, 'content': task_name, 'project': {'type': 'Project', 'id': PROJECT_ID}})
-
-    # Check if the version exists
-    version_code = f"{short_name.split('.')[0]}"
-    version_entity = get_entity('Version', [['code', 'is', version_code]])
-    if version_entity:
-        print(f"Version '{version_code}' found. Updating version.")
-        if proxy:
-            sg.upload("Version", version_entity['id'], proxy, field_name="sg_uploaded_movie")
-    else:
-        print(f"Version '{version_code}' not found. Creating new version.")
-        version_data = {
-            'code': version_code,
-            'entity': shot_entity,
-            'sg_task': task_entity,
-            'project': {'type': 'Project', 'id': PROJECT_ID}
+    version_codes = sorted({publish['version_code'] for publish in publishes})
+    # The client is shared between threads, so both queries are in flight at once
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        version_future = executor.submit(sg.find, 'Version', [['code', 'in', version_codes]], ['code'])
+        # The shots' tasks come back with them, named by content
+        shots = {}
+        if uncached_shots:
+            for shot in sg.find('Shot', [['code', 'in', sorted(uncached_shots)]], ['code', 'tasks']):
+                shots[shot['code']] = shot
+        versions = {version['code']: _entity_link(version) for version in version_future.result()}
+
+    for publish in publishes:
+        shot_code = publish['shot_code']
+        publish['version'] = versions.get(publish['version_code'])
+        if shot_code not in uncached_shots:
+            continue
+
+        shot = shots.get(shot_code)
+        if not shot:
+            publish['shot'] = publish['task'] = None
+            continue
+        publish['shot'] = _entity_link(shot)
+        publish['task'] = _find_linked(shot.get('tasks'), publish['task_name'])
+        cache_entity(entity_cache_key(shot_code), publish['shot'], save=False)
+        if publish['task']:
+            cache_entity(entity_cache_key(shot_code, publish['task_name']), publish['task'], save=False)
+
+def _create_missing(publishes, field, entity_type, key_func, data_func):
+    """Create the entities missing from field, one per distinct key, in a single batch.
+
+    Returns the created entities by key.
+    """
+    missing = {}
+    for publish in publishes:
+        if not publish[field]:
+            key = key_func(publish)
+            if key not in missing:
+                missing[key] = data_func(publish)
+                name = missing[key].get('code') or missing[key].get('content')
+                print(f"{entity_type} '{name}' not found. Creating new {entity_type.lower()}.")
+    if not missing:
+        return {}
+
+    keys = list(missing)
+    created = dict(zip(keys, batch_create(entity_type, [missing[key] for key in keys])))
+    for publish in publishes:
+        if not publish[field]:
+            publish[field] = created[key_func(publish)]
+    return created
+
+def create_missing_entities(publishes):
+    """Create whichever Shots, Tasks and Versions of many publishes are missing.
+
+    Entities created in a batch can't be linked to from the same batch, so there is
+    one batch per level (Shots, then Tasks, then Versions) that has something to create.
+    Shots and Tasks shared by several publishes are only created once, and are cached
+    without saving the entity cache.
+    """
+    project = {'type': 'Project', 'id': PROJECT_ID}
+
+    found_versions = set()
+    for publish in publishes:
+        if publish['version'] and publish['version_code'] not in found_versions:
+            found_versions.add(publish['version_code'])
+            print(f"Version '{publish['version_code']}' found. Updating version.")
+
+    shots = _create_missing(
+        publishes, 'shot', 'Shot',
+        lambda publish: publish['shot_code'],
+        lambda publish: {'code': publish['shot_code'], 'project': project}
+    )
+    tasks = _create_missing(
+        publishes, 'task', 'Task',
+        lambda publish: (publish['shot_code'], publish['task_name']),
+        lambda publish: {'entity': publish['shot'], 'content': publish['task_name'], 'project': project}
+    )
+    _create_missing(
+        publishes, 'version', 'Version',
+        lambda publish: publish['version_code'],
+        lambda publish: {
+            'code': publish['version_code'],
+            'entity': publish['shot'],
+            'sg_task': publish['task'],
+            'project': project
         }
-        version_entity = sg.create('Version', version_data)
-        if proxy:
-            sg.upload("Version", version_entity['id'], proxy, field_name="sg_uploaded_movie")
+    )
+
+    # Entities read from the cache keep their timestamp, so their TTL still runs out
+    for shot_code, shot in shots.items():
+        cache_entity(entity_cache_key(shot_code), shot, save=False)
+    for (shot_code, task_name), task in tasks.items():
+        cache_entity(entity_cache_key(shot_code, task_name), task, save=False)
+
+def _upload_movie(publish):
+    sg.upload("Version", publish['version']['id'], publish['proxy'], field_name="sg_uploaded_movie")
+
+def _upload_thumbnail(publish):
+    sg.upload_thumbnail("Version", publish['version']['id'], publish['previews']['thumbnail'])
+
+def _upload_filmstrip(publish):
+    sg.upload_filmstrip_thumbnail("Version", publish['version']['id'], publish['previews']['filmstrip'])
+
+def publish_many(items, upload_workers=PUBLISH_UPLOAD_WORKERS):
+    """Publish many (short_name, proxy) or (short_name, proxy, previews) items to ShotGrid at once.
+
+    previews is a dict with optional 'thumbnail' and 'filmstrip' image paths, uploaded
+    alongside the movie so the Version has a poster frame before ShotGrid has
+    transcoded the movie. Lookups are shared between publishes of the same shot,
+    missing entities are created in batches and the files are uploaded by a pool of
+    upload_workers threads. Returns one dict per item, in order, with 'short_name',
+    'proxy', 'previews', 'shot', 'task', 'version', 'url' and 'error' (the exception
+    that stopped the publish, or None).
+    """
+    results = [_new_publish(*item) for item in items]
+    publishes = [publish for publish in results if not publish['error']]
+    if not publishes:
+        return results
+
+    try:
+        try:
+            resolve_entities(publishes)
+            create_missing_entities(publishes)
+        except shotgun_api3.Fault as e:
+            # A cached shot or task may have been deleted since it was cached
+            print(f"Creating entities failed ({e}). Refreshing cached shots and tasks.")
+            keys = set()
+            for publish in publishes:
+                keys.add(entity_cache_key(publish['shot_code']))
+                keys.add(entity_cache_key(publish['shot_code'], publish['task_name']))
+            invalidate_cached_entity(*keys)
+            resolve_entities(publishes, use_cache=False)
+            create_missing_entities(publishes)
+    except Exception as e:
+        for publish in publishes:
+            publish['error'] = e
+        return results
+    finally:
+        # Written once for every entity looked up or created above
+        save_entity_cache()
+
+    for publish in publishes:
+        publish['url'] = f"{SHOTGRID_URL}/detail/Version/{publish['version']['id']}"
+
+    # Movies, thumbnails and filmstrips all share the upload pool
+    uploads = []
+    for publish in publishes:
+        if publish['proxy']:
+            uploads.append((_upload_movie, publish, publish['proxy']))
+        if publish['previews'].get('thumbnail'):
+            uploads.append((_upload_thumbnail, publish, publish['previews']['thumbnail']))
+            if publish['previews'].get('filmstrip'):
+                # ShotGrid only shows a filmstrip on entities that also have a thumbnail
+                uploads.append((_upload_filmstrip, publish, publish['previews']['filmstrip']))
+
+    with ThreadPoolExecutor(max_workers=max(1, upload_workers)) as executor:
+        futures = {executor.submit(upload, publish): (upload, publish, path) for upload, publish, path in uploads}
+        for future in as_completed(futures):
+            upload, publish, path = futures[future]
+            try:
+                future.result()
+                print(f"Uploaded {path} to {publish['url']}")
+            except Exception as e:
+                print(f"Upload of {path} failed: {e}")
+                # A missing preview is only cosmetic, the publish still succeeded
+                if upload is _upload_movie:
+                    publish['error'] = e
+
+    return results
+
+def update_version(short_name, proxy=None, previews=None):
+    """Update or create a version in ShotGrid based on the parsed filename."""
+    publish = publish_many([(short_name, proxy, previews)])[0]
+    if 'version_code' not in publish:
+        # The filename could not be parsed, the error has been printed
+        return
+    if publish['error']:
+        raise publish['error']
 
     # Open the link to the new version in ShotGrid
-    version_url = f"{SHOTGRID_URL}/detail/Version/{version_entity['id']}"
+    version_url = publish['url']
     webbrowser.open(version_url)
     print(f"Upload complete. Version URL: {version_url}")
+    return version_url
 
 ################################################################################
 # Unit Testing
@@ -0,0 +1,77 @@
+"""
+Asyncio access to a Shotgun site.
+
+:class:`AsyncShotgun` exposes the common :class:`~shotgun_api3.Shotgun` calls as
+coroutines, so many requests can be in flight at once::
+
+    sg = shotgun_api3.Shotgun(url, script_name, api_key)
+    async with AsyncShotgun(sg, max_connections=8) as asg:
+        shots, versions = await asyncio.gather(
+            asg.find("Shot", [["project", "is", project]], ["code"]),
+            asg.find("Version", [["project", "is", project]], ["code"]),
+        )
+
+.. note:: This module requires Python 3 and is not imported by the package.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncShotgun(object):
+    """
+    Asyncio front end for a :class:`~shotgun_api3.Shotgun` client.
+
+    Every call runs on a worker thread of its own, and the client checks a pooled
+    keep-alive connection out for each request, so up to ``max_connections`` requests are
+    in flight at once while the event loop stays free. Raise
+    ``sg.config.connection_pool_size`` as well to allow more than its default 8. The
+    methods take the same arguments as their :class:`~shotgun_api3.Shotgun` counterparts.
+    """
+
+    def __init__(self, sg, max_connections=8):
+        """
+        :param sg: Connected :class:`~shotgun_api3.Shotgun` instance.
+        :param int max_connections: Maximum number of concurrent requests.
+        """
+        self.sg = sg
+        self._executor = ThreadPoolExecutor(max_workers=max_connections, thread_name_prefix="AsyncShotgun")
+
+    async def _call(self, method, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(getattr(self.sg, method), *args, **kwargs)
+        )
+
+    async def find(self, entity_type, filters, fields=None, *args, **kwargs):
+        return await self._call("find", entity_type, filters, fields, *args, **kwargs)
+
+    async def find_one(self, entity_type, filters, fields=None, *args, **kwargs):
+        return await self._call("find_one", entity_type, filters, fields, *args, **kwargs)
+
+    async def create(self, entity_type, data, return_fields=None):
+        return await self._call("create", entity_type, data, return_fields)
+
+    async def update(self, entity_type, entity_id, data, *args, **kwargs):
+        return await self._call("update", entity_type, entity_id, data, *args, **kwargs)
+
+    async def batch(self, requests):
+        return await self._call("batch", requests)
+
+    async def upload(self, entity_type, entity_id, path, field_name=None, *args, **kwargs):
+        return await self._call("upload", entity_type, entity_id, path, field_name, *args, **kwargs)
+
+    def close(self):
+        """
+        Wait for the running calls to finish and stop the worker threads.
+
+        The client is left open, it still belongs to the caller.
+        """
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
@@ -39,13 +39,18 @@ from .lib.six.moves import http_cookiejar  # used for attachment upload
 import datetime
 import logging
 import uuid                                # used for attachment upload
+import zlib                                # used for request compression
 import os
 import re
 import copy
+import collections
+import select                              # used for the connection pool health check
 import stat                                # used for attachment upload
 import sys
 import time
 import json
+import threading                           # used for multipart upload
+from .lib.six.moves import queue           # used for multipart upload
 from .lib.six.moves import urllib
 import shutil       # used for attachment download
 from .lib.six.moves import http_client      # Used for secure file upload.
@@ -120,6 +125,16 @@ except ImportError as e:
     LOG.debug("ssl not found, disabling certificate validation")
     NO_SSL_VALIDATION = True
 
+# Optional faster json backends, see _Config.json_codec
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 # ----------------------------------------------------------------------------
 # Version
 __version__ = "3.3.4"
@@ -407,6 +422,42 @@ class _Config(object):
         # (like connection attempts) will timeout after that many seconds
         # (if it is not given, the global default timeout setting is used)
         self.timeout_secs = None
+        # Number of parts of a multipart upload that are sent to Cloud storage at the
+        # same time. At most this many chunks of the file are held in memory during an
+        # upload. Setting it to 1 uploads the parts one after the other.
+        self.multipart_upload_concurrency = 4
+        # Number of times a single part of a multipart upload is attempted before the
+        # whole upload is considered failed.
+        self.multipart_upload_part_attempts = 3
+        # When True, multipart uploads record their progress in a small journal file
+        # next to the uploaded file (see _UploadJournal). If the upload is interrupted,
+        # uploading the same unchanged file again only sends the missing parts.
+        self.resumable_uploads = False
+        # Number of pages of a find() requested at the same time once the first page
+        # has been read. Setting it to 1 requests the pages one after the other.
+        self.read_page_concurrency = 1
+        # Number of date time strings received from the server whose converted datetime
+        # is kept, so the values repeated across records are only parsed once.
+        self.datetime_cache_size = 10000
+        # Library used to encode requests and decode responses: "json" for the standard
+        # library, "orjson" or "ujson" for those faster backends, or "auto" for the fastest
+        # one installed. A backend that isn't installed falls back on "json". Values the
+        # json module refuses fall back on it, so they still raise TypeError, but orjson
+        # sends NaN and infinite floats as null and encodes UUID and Enum values where the
+        # json module would raise.
+        self.json_codec = "json"
+        # When True, rpc request bodies of at least compress_requests_min_size bytes are
+        # sent gzip compressed, which helps large batch and create calls over slow links.
+        # Responses are always requested compressed. See Shotgun.transfer_stats.
+        self.compress_requests = False
+        self.compress_requests_min_size = 16 * 1024
+        # Maximum number of keep-alive connections held open to the server. Each request
+        # checks a connection out for the calling thread, so this is also the maximum
+        # number of requests a client sends at the same time from several threads.
+        self.connection_pool_size = 8
+        # Number of seconds a connection may sit unused in the pool before it is closed
+        # instead of reused, as servers and proxies drop idle keep-alive connections.
+        self.connection_idle_timeout = 60
         self.api_ver = "api3"
         self.convert_datetimes_to_utc = True
         self._records_per_page = None
@@ -647,6 +698,10 @@ class Shotgun(object):
                              "got '%s'." % self.config.rpc_attempt_interval)
 
         self._connection = None
+        self._connection_lock = threading.Lock()
+        # {convert_datetimes_to_utc: _LRUCache of converted date time strings}
+        self._datetime_caches = {}
+        self.transfer_stats = _TransferStats()
 
         self.__ca_certs = self._get_certs_file(ca_certs)
 
@@ -973,6 +1028,50 @@ class Shotgun(object):
         :rtype: list
         """
 
+        params = self._build_find_params(entity_type, filters, fields, order, filter_operator, limit,
+                                         retired_only, page, include_archived_projects,
+                                         additional_filter_presets)
+
+        records = []
+        for entities in self._read_pages(params, limit, page):
+            records.extend(entities)
+        return self._parse_records(records)
+
+    def find_iter(self, entity_type, filters, fields=None, order=None, filter_operator=None, limit=0,
+                  retired_only=False, include_archived_projects=True, additional_filter_presets=None,
+                  prefetch=False):
+        """
+        Find entities matching the given filters, yielding them one page at a time.
+
+        Takes the same arguments as :meth:`find`, but instead of collecting every page before
+        returning, each page of results is parsed and its entities are yielded as soon as it
+        arrives. Only one page is held in memory at a time, which keeps large queries such as
+        all the Versions of a project cheap::
+
+            >>> for version in sg.find_iter("Version", filters, ["code"], prefetch=True):
+            ...     process(version)
+
+        :param bool prefetch: Optional boolean flag to request the next page in a background
+            thread while the current one is being processed, hiding the latency of the
+            request. Defaults to ``False``.
+        :returns: Generator of dictionaries representing each entity with the requested fields,
+            and the defaults ``"id"`` and ``"type"`` which are always included.
+        """
+        params = self._build_find_params(entity_type, filters, fields, order, filter_operator, limit,
+                                         retired_only, 0, include_archived_projects,
+                                         additional_filter_presets)
+        pages = self._read_pages(params, limit, 0)
+        if prefetch:
+            pages = _prefetch_iter(pages)
+        for entities in pages:
+            for record in self._parse_records(entities):
+                yield record
+
+    def _build_find_params(self, entity_type, filters, fields, order, filter_operator, limit,
+                           retired_only, page, include_archived_projects, additional_filter_presets):
+        """
+        Validate the arguments of :meth:`find` and build the parameters of its read request.
+        """
         if not isinstance(limit, int) or limit < 0:
             raise ValueError("limit parameter must be a positive integer")
 
@@ -1006,55 +1105,118 @@ class Shotgun(object):
             params["api_return_image_urls"] = True
 
         if self.server_caps.ensure_paging_info_without_counts_support():
-            paging_info_param = "return_paging_info_without_counts"
+            params["return_paging_info_without_counts"] = False
         else:
-            paging_info_param = "return_paging_info"
-
-        params[paging_info_param] = False
+            params["return_paging_info"] = False
 
         if limit and limit <= self.config.records_per_page:
             params["paging"]["entities_per_page"] = limit
-            # If page isn't set and the limit doesn't require pagination,
-            # then trigger the faster code path.
-            if page == 0:
-                page = 1
+        return params
 
-        # if page is specified, then only return the page of records requested
-        if page != 0:
-            params["paging"]["current_page"] = page
-            records = self._call_rpc("read", params).get("entities", [])
-            return self._parse_records(records)
+    def _read_pages(self, params, limit, page):
+        """
+        Request the pages of a read, yielding the unparsed entities of each page.
 
-        params[paging_info_param] = True
-        records = []
+        :param dict params: Read parameters built by :meth:`_build_find_params`.
+        :param int limit: Maximum number of entities to yield in total, ``0`` for no limit.
+        :param int page: Page to request on its own, or ``0`` to request every page.
 
-        if self.server_caps.ensure_paging_info_without_counts_support():
-            has_next_page = True
-            while has_next_page:
-                result = self._call_rpc("read", params)
-                records.extend(result.get("entities"))
+        After the first page, up to ``config.read_page_concurrency`` pages are requested at
+        the same time and yielded in order.
+        """
+        # If page isn't set and the limit doesn't require pagination,
+        # then trigger the faster code path.
+        if page == 0 and limit and limit <= self.config.records_per_page:
+            page = 1
 
-                if limit and len(records) >= limit:
-                    records = records[:limit]
-                    break
+        # if page is specified, then only return the page of records requested
+        if page != 0:
+            params["paging"]["current_page"] = page
+            yield self._call_rpc("read", params).get("entities", [])
+            return
 
-                has_next_page = result["paging_info"]["has_next_page"]
-                params["paging"]["current_page"] += 1
+        without_counts = self.server_caps.ensure_paging_info_without_counts_support()
+        if without_counts:
+            params["return_paging_info_without_counts"] = True
         else:
-            result = self._call_rpc("read", params)
-            while result.get("entities"):
-                records.extend(result.get("entities"))
-
-                if limit and len(records) >= limit:
-                    records = records[:limit]
-                    break
-                if len(records) == result["paging_info"]["entity_count"]:
-                    break
-
-                params["paging"]["current_page"] += 1
-                result = self._call_rpc("read", params)
-
-        return self._parse_records(records)
+            params["return_paging_info"] = True
+
+        concurrency = max(1, self.config.read_page_concurrency)
+        entities_per_page = params["paging"]["entities_per_page"]
+        next_page = params["paging"]["current_page"]
+        count = 0
+        results = [self._call_rpc("read", params)]
+        while True:
+            for result in results:
+                entities = result.get("entities")
+                if not without_counts and not entities:
+                    return
+                count += len(entities)
+
+                if limit and count >= limit:
+                    yield entities[:len(entities) - (count - limit)]
+                    return
+                yield entities
+
+                if without_counts:
+                    if not result["paging_info"]["has_next_page"]:
+                        return
+                elif count == result["paging_info"]["entity_count"]:
+                    return
+                next_page += 1
+
+            # Don't request more pages than the count or the limit leave to read
+            remaining = None
+            if not without_counts:
+                remaining = result["paging_info"]["entity_count"] - count
+            if limit:
+                remaining = limit - count if remaining is None else min(remaining, limit - count)
+            window = concurrency
+            if remaining is not None:
+                window = max(1, min(window, (remaining + entities_per_page - 1) // entities_per_page))
+            results = self._read_page_window(params, next_page, window)
+
+    def _read_page_window(self, params, first_page, page_count):
+        """
+        Request consecutive pages of a read at the same time.
+
+        Servers that don't return the entity count only tell if there is a next page, so
+        pages past the last one may be requested and come back empty. Callers stop at the
+        first page without a next page.
+
+        :param dict params: Read parameters, left unchanged.
+        :param int first_page: Number of the first page to request.
+        :param int page_count: Number of pages to request.
+        :returns: List of the read results, in page order.
+        """
+        if page_count == 1:
+            params["paging"]["current_page"] = first_page
+            return [self._call_rpc("read", params)]
+
+        results = [None] * page_count
+        errors = []
+
+        def _read_page(index):
+            page_params = dict(params)
+            page_params["paging"] = dict(params["paging"], current_page=first_page + index)
+            try:
+                results[index] = self._call_rpc("read", page_params)
+            except Exception as e:
+                errors.append(e)
+
+        workers = []
+        for index in range(page_count):
+            worker = threading.Thread(target=_read_page, args=(index,))
+            worker.daemon = True
+            worker.start()
+            workers.append(worker)
+        for worker in workers:
+            worker.join()
+
+        if errors:
+            raise errors[0]
+        LOG.debug("Read pages %d to %d concurrently" % (first_page, first_page + page_count - 1))
+        return results
 
     def _construct_read_parameters(self,
                                    entity_type,
@@ -2383,6 +2545,10 @@ class Shotgun(object):
           Make sure to have retries for file uploads. Failures when uploading will occasionally happen. 
           When it does, immediately retrying to upload usually works
 
+        .. note::
+          Set ``sg.config.resumable_uploads = True`` to make retries of large Cloud storage
+          uploads resume from the last completed part instead of starting over.
+
         >>> mov_file = '/data/show/ne2/100_110/anim/01.mlk-02b.mov'
         >>> sg.upload("Shot", 423, mov_file, field_name="sg_latest_quicktime",
         ...           display_name="Latest QT")
@@ -2457,13 +2623,35 @@ class Shotgun(object):
 
         is_multipart_upload = (os.path.getsize(path) > self._MULTIPART_UPLOAD_CHUNK_SIZE)
 
-        upload_info = self._get_attachment_upload_info(is_thumbnail, filename, is_multipart_upload)
+        journal = None
+        upload_info = None
+        if is_multipart_upload and self.config.resumable_uploads:
+            journal = _UploadJournal(path, self._MULTIPART_UPLOAD_CHUNK_SIZE, is_thumbnail)
+            upload_info = journal.load()
+
+        is_resumed_upload = upload_info is not None
+        if not is_resumed_upload:
+            upload_info = self._get_attachment_upload_info(is_thumbnail, filename, is_multipart_upload)
+            if journal:
+                journal.start(upload_info)
 
         # Step 2: upload the file
         # We upload large files in multiple parts because it is more robust
         # (and required when using S3 storage)
         if is_multipart_upload:
-            self._multipart_upload_file_to_storage(path, upload_info)
+            try:
+                self._multipart_upload_file_to_storage(path, upload_info, journal)
+            except _UploadRejectedError as e:
+                if not is_resumed_upload:
+                    raise
+                # The server or the storage refused the upload recorded in the journal,
+                # most likely because it expired. Start again from scratch, once, so a
+                # dead journal isn't reloaded and failed again on every retry. Errors
+                # reaching them keep the journal, so a later retry resumes where it is.
+                LOG.debug("Resumed upload of %s was refused (%s), restarting it." % (path, e))
+                upload_info = self._get_attachment_upload_info(is_thumbnail, filename, is_multipart_upload)
+                journal.start(upload_info)
+                self._multipart_upload_file_to_storage(path, upload_info, journal)
         else:
             self._upload_file_to_storage(path, upload_info["upload_url"])
 
@@ -2502,6 +2690,9 @@ class Shotgun(object):
 
         LOG.debug("Attachment linked to content on Cloud storage")
 
+        if journal:
+            journal.remove()
+
         attachment_id = int(result.split(":", 2)[1].split("\n", 1)[0])
         return attachment_id
 
@@ -3353,6 +3544,17 @@ class Shotgun(object):
             "connection": "keep-alive"
         }
 
+        if self.config.compress_requests and len(encoded_payload) >= self.config.compress_requests_min_size:
+            compressed_payload = _gzip_compress(encoded_payload)
+            LOG.debug("Compressed %s request from %d to %d bytes" % (
+                method, len(encoded_payload), len(compressed_payload)))
+            self.transfer_stats.add_request(len(encoded_payload), len(compressed_payload))
+            if len(compressed_payload) < len(encoded_payload):
+                encoded_payload = compressed_payload
+                req_headers["content-encoding"] = "gzip"
+        else:
+            self.transfer_stats.add_request(len(encoded_payload), len(encoded_payload))
+
         if self.config.localized is True:
             req_headers["locale"] = "auto"
 
@@ -3369,6 +3571,8 @@ class Shotgun(object):
             )
 
             LOG.debug("Completed rpc call to %s" % (method))
+            # httplib2 decompresses the body and renames the content-encoding header
+            self.transfer_stats.add_response(resp_headers.get("-content-encoding") is not None)
 
             try:
                 self._parse_http_status(http_status)
@@ -3390,9 +3594,9 @@ class Shotgun(object):
             else:
                 break
 
-        response = self._decode_response(resp_headers, body)
+        # Dates and times are converted while the json is decoded, see _inbound_object_hook
+        response = self._decode_response(resp_headers, body, self._inbound_object_hook())
         self._response_errors(response)
-        response = self._transform_inbound(response)
 
         if not isinstance(response, dict) or "results" not in response:
             return response
@@ -3494,8 +3698,7 @@ class Shotgun(object):
         be in a single byte encoding to go over the wire.
         """
 
-        wire = json.dumps(payload, ensure_ascii=False)
-        return six.ensure_binary(wire)
+        return self._json_codec().dumps(payload)
 
     def _make_call(self, verb, path, body, headers):
         """
@@ -3553,7 +3756,8 @@ class Shotgun(object):
                 if attempt == max_rpc_attempts:
                     raise
             except Exception:
-                self._close_connection()
+                # _http_request already evicted the connection that failed, the ones
+                # other threads are using are left alone.
                 if attempt == max_rpc_attempts:
                     LOG.debug("Request failed.  Giving up after %d attempts." % attempt)
                     raise
@@ -3572,8 +3776,14 @@ class Shotgun(object):
         LOG.debug("Request headers are %s" % headers)
         LOG.debug("Request body is %s" % body)
 
-        conn = self._get_connection()
-        resp, content = conn.request(url, method=verb, body=body, headers=headers)
+        pool = self._get_connection()
+        conn = pool.checkout(self.config.server)
+        try:
+            resp, content = conn.request(url, method=verb, body=body, headers=headers)
+        except Exception:
+            pool.discard(conn)
+            raise
+        pool.checkin(conn)
         # http response code is handled else where
         http_status = (resp.status, resp.reason)
         resp_headers = dict(
@@ -3621,13 +3831,15 @@ class Shotgun(object):
 
         return
 
-    def _decode_response(self, headers, body):
+    def _decode_response(self, headers, body, object_hook=None):
         """
         Decode the response from the server from the wire format to
         a python data structure.
 
         :param dict headers: Headers from the server.
         :param str body: Raw response body from the server.
+        :param object_hook: Optional function called with every decoded json object,
+            whose return value is used in its place.
         :returns: If the content-type starts with application/json or
             text/javascript the body is json decoded. Otherwise the raw body is
             returned.
@@ -3639,13 +3851,21 @@ class Shotgun(object):
         ct = (headers.get("content-type") or "application/json").lower()
 
         if ct.startswith("application/json") or ct.startswith("text/javascript"):
-            return self._json_loads(body)
+            return self._json_loads(body, object_hook)
         return body
 
-    def _json_loads(self, body):
-        return json.loads(body)
+    def _json_loads(self, body, object_hook=None):
+        return self._json_codec().loads(body, object_hook)
 
-    def _json_loads_ascii(self, body):
+    def _json_codec(self):
+        """
+        Return the json codec selected by ``config.json_codec``.
+
+        :raises ValueError: If the config names an unknown codec.
+        """
+        return _get_json_codec(self.config.json_codec)
+
+    def _json_loads_ascii(self, body, object_hook=None):
         """
         See http://stackoverflow.com/questions/956867
         """
@@ -3669,6 +3889,8 @@ class Shotgun(object):
                 elif isinstance(v, list):
                     v = _decode_list(v)
                 newdict[k] = v
+            if object_hook:
+                return object_hook(newdict)
             return newdict
         return json.loads(body, object_hook=_decode_dict)
 
@@ -3734,12 +3956,52 @@ class Shotgun(object):
 
         return visitor(data)
 
+    def _visit_data_copy_on_write(self, data, visitor):
+        """
+        Walk the data (simple python types) and call the visitor, like :meth:`_visit_data`.
+
+        Lists, tuples and dicts are only copied when the visitor changed one of the values
+        they hold, directly or further down. Data the visitor left unchanged is returned
+        as is, without allocating anything.
+        """
+
+        if not data:
+            return data
+
+        recursive = self._visit_data_copy_on_write
+        if isinstance(data, (list, tuple)):
+            copied = None
+            for index, item in enumerate(data):
+                value = recursive(item, visitor)
+                if value is not item:
+                    if copied is None:
+                        copied = list(data)
+                    copied[index] = value
+            if copied is None:
+                return data
+            return tuple(copied) if isinstance(data, tuple) else copied
+
+        if isinstance(data, dict):
+            copied = None
+            for k, v in six.iteritems(data):
+                value = recursive(v, visitor)
+                if value is not v:
+                    if copied is None:
+                        copied = dict(data)
+                    copied[k] = value
+            return data if copied is None else copied
+
+        return visitor(data)
+
     def _transform_outbound(self, data):
         """
         Transform data types or values before they are sent by the client.
 
         - changes timezones
         - converts dates and times to strings
+
+        The data passed in is never modified, but it is only copied as far as needed to
+        hold the transformed values, so payloads without dates and times are returned as is.
         """
 
         if self.config.convert_datetimes_to_utc:
@@ -3754,6 +4016,10 @@ class Shotgun(object):
 
         def _outbound_visitor(value):
 
+            # Most values are text, which is sent as is
+            if isinstance(value, six.text_type):
+                return value
+
             if isinstance(value, datetime.datetime):
                 if _change_tz:
                     value = _change_tz(value)
@@ -3781,11 +4047,55 @@ class Shotgun(object):
 
             return value
 
-        return self._visit_data(data, _outbound_visitor)
+        return self._visit_data_copy_on_write(data, _outbound_visitor)
 
     def _transform_inbound(self, data):
         """
         Transforms data types or values after they are received from the server.
+
+        Responses to rpc calls are transformed while they are decoded instead, see
+        :meth:`_inbound_object_hook`.
+        """
+        return self._visit_data(data, self._inbound_visitor())
+
+    def _inbound_object_hook(self):
+        """
+        Return a json object hook applying :meth:`_transform_inbound` to decoded data.
+
+        The hook converts the values of each object in place as it is decoded, including
+        the values of the lists it holds, so the response is neither walked again nor
+        copied once decoded. Objects are decoded innermost first, so nested objects have
+        already been converted when the hook sees them.
+        """
+        visitor = self._inbound_visitor()
+        string_types = six.string_types
+
+        def _convert_list(values):
+            for index, value in enumerate(values):
+                if isinstance(value, string_types):
+                    if len(value) == 20:
+                        values[index] = visitor(value)
+                elif isinstance(value, list):
+                    _convert_list(value)
+
+        def _object_hook(obj):
+            for key, value in six.iteritems(obj):
+                if isinstance(value, string_types):
+                    # Only date times are converted, which are always 20 characters long
+                    if len(value) == 20:
+                        obj[key] = visitor(value)
+                elif isinstance(value, list):
+                    _convert_list(value)
+            return obj
+
+        return _object_hook
+
+    def _inbound_visitor(self):
+        """
+        Return a function converting a value received from the server.
+
+        Date time strings are converted to datetimes, in the local time zone if
+        ``config.convert_datetimes_to_utc`` is set. Other values are returned unchanged.
         """
         # NOTE: The time zone is removed from the time after it is transformed
         # to the local time, otherwise it will fail to compare to datetimes
@@ -3796,59 +4106,71 @@ class Shotgun(object):
         else:
             _change_tz = None
 
+        convert = bool(_change_tz)
+        cache = self._datetime_caches.get(convert)
+        if cache is None:
+            cache = self._datetime_caches.setdefault(convert, _LRUCache(self.config.datetime_cache_size))
+
         def _inbound_visitor(value):
             if isinstance(value, six.string_types):
                 if len(value) == 20 and self._DATE_TIME_PATTERN.match(value):
+                    converted = cache.get(value)
+                    if converted is not None:
+                        return converted
                     try:
-                        # strptime was not on datetime in python2.4
-                        value = datetime.datetime(
-                            *time.strptime(value, "%Y-%m-%dT%H:%M:%SZ")[:6])
+                        converted = _parse_datetime_string(value)
                     except ValueError:
                         return value
                     if _change_tz:
-                        return _change_tz(value)
-                    return value
+                        converted = _change_tz(converted)
+                    cache.set(value, converted)
+                    return converted
 
             return value
 
-        return self._visit_data(data, _inbound_visitor)
+        return _inbound_visitor
 
     # ========================================================================
     # Connection Functions
 
     def _get_connection(self):
         """
-        Return the current connection or creates a new connection to the current server.
+        Return the connection pool, creating it on first use.
+
+        :returns: :class:`_ConnectionPool` of connections to the server.
         """
-        if self._connection is not None:
+        with self._connection_lock:
+            if self._connection is None:
+                self._connection = _ConnectionPool(
+                    self._create_connection,
+                    self.config.connection_pool_size,
+                    self.config.connection_idle_timeout,
+                )
             return self._connection
 
+    def _create_connection(self):
+        """
+        Create a new connection to the current server.
+        """
         if self.config.proxy_server:
             pi = ProxyInfo(socks.PROXY_TYPE_HTTP, self.config.proxy_server,
                            self.config.proxy_port, proxy_user=self.config.proxy_user,
                            proxy_pass=self.config.proxy_pass)
-            self._connection = Http(timeout=self.config.timeout_secs, ca_certs=self.__ca_certs,
-                                    proxy_info=pi, disable_ssl_certificate_validation=self.config.no_ssl_validation)
-        else:
-            self._connection = Http(timeout=self.config.timeout_secs, ca_certs=self.__ca_certs,
-                                    proxy_info=None, disable_ssl_certificate_validation=self.config.no_ssl_validation)
-
-        return self._connection
+            return Http(timeout=self.config.timeout_secs, ca_certs=self.__ca_certs,
+                        proxy_info=pi, disable_ssl_certificate_validation=self.config.no_ssl_validation)
+        return Http(timeout=self.config.timeout_secs, ca_certs=self.__ca_certs,
+                    proxy_info=None, disable_ssl_certificate_validation=self.config.no_ssl_validation)
 
     def _close_connection(self):
         """
-        Close the current connection.
-        """
-        if self._connection is None:
-            return
+        Close every connection to the server.
 
-        for conn in self._connection.connections.values():
-            try:
-                conn.close()
-            except Exception:
-                pass
-        self._connection.connections.clear()
-        self._connection = None
+        Connections checked out by other threads are closed when they are checked back in.
+        """
+        with self._connection_lock:
+            pool, self._connection = self._connection, None
+        if pool is not None:
+            pool.close()
         return
     # ========================================================================
     # Utility
@@ -3982,12 +4304,20 @@ class Shotgun(object):
 
         LOG.debug("File uploaded to Cloud storage: %s", filename)
 
-    def _multipart_upload_file_to_storage(self, path, upload_info):
+    def _multipart_upload_file_to_storage(self, path, upload_info, journal=None):
         """
         Internal function to upload a file to the Cloud storage in multiple parts.
 
+        Up to ``config.multipart_upload_concurrency`` parts are uploaded at the same time.
+        The file is read from the calling thread, which waits before reading the next
+        chunk while that many parts are queued or in flight, so memory use is bounded.
+
         :param str path: Full path to an existing non-empty file on disk to upload.
         :param dict upload_info: Contains details received from the server, about the upload.
+        :param journal: Optional :class:`_UploadJournal` of a resumable upload. Parts it
+            already lists are skipped and newly uploaded parts are recorded in it.
+        :raises _UploadRejectedError: If the server or the storage refused the upload, for
+            instance because it expired.
         """
 
         fd = open(path, "rb")
@@ -3997,20 +4327,63 @@ class Shotgun(object):
             file_size = os.fstat(fd.fileno())[stat.ST_SIZE]
             filename = os.path.basename(path)
 
-            etags = []
-            part_number = 1
-            bytes_read = 0
             chunk_size = self._MULTIPART_UPLOAD_CHUNK_SIZE
-            while bytes_read < file_size:
-                data = fd.read(chunk_size)
-                data_size = len(data)
-                # keep data as a stream so that we don't need to worry how it was
-                # encoded.
-                data = BytesIO(data)
-                bytes_read += data_size
-                part_url = self._get_upload_part_link(upload_info, filename, part_number)
-                etags.append(self._upload_data_to_storage(data, content_type, data_size, part_url))
-                part_number += 1
+            part_count = max(1, (file_size + chunk_size - 1) // chunk_size)
+            concurrency = max(1, min(self.config.multipart_upload_concurrency, part_count))
+
+            # etags must be sent back in part order, whatever order the parts finish in.
+            etags = [None] * part_count
+            if journal:
+                for part_number, etag in six.iteritems(journal.parts):
+                    if part_number <= part_count:
+                        etags[part_number - 1] = etag
+            errors = []
+            slots = threading.BoundedSemaphore(concurrency)
+            parts = queue.Queue()
+
+            def _upload_parts():
+                while True:
+                    part = parts.get()
+                    if part is None:
+                        return
+                    part_number, data = part
+                    try:
+                        if not errors:
+                            etags[part_number - 1] = self._upload_part_to_storage(
+                                upload_info, filename, part_number, data, content_type
+                            )
+                            if journal:
+                                journal.add_part(part_number, etags[part_number - 1])
+                    except Exception as e:
+                        errors.append(e)
+                    finally:
+                        slots.release()
+
+            workers = []
+            for _ in range(concurrency):
+                worker = threading.Thread(target=_upload_parts)
+                worker.daemon = True
+                worker.start()
+                workers.append(worker)
+
+            try:
+                for part_number in range(1, part_count + 1):
+                    if etags[part_number - 1] is not None:
+                        continue
+                    slots.acquire()
+                    if errors:
+                        slots.release()
+                        break
+                    fd.seek((part_number - 1) * chunk_size)
+                    parts.put((part_number, fd.read(chunk_size)))
+            finally:
+                for _ in workers:
+                    parts.put(None)
+                for worker in workers:
+                    worker.join()
+
+            if errors:
+                raise errors[0]
 
             self._complete_multipart_upload(upload_info, filename, etags)
         finally:
@@ -4018,6 +4391,38 @@ class Shotgun(object):
 
         LOG.debug("File uploaded in multiple parts to Cloud storage: %s", path)
 
+    def _upload_part_to_storage(self, upload_info, filename, part_number, data, content_type):
+        """
+        Internal function to upload a single part of a multi-part upload to the Cloud
+        storage. The part is retried up to ``config.multipart_upload_part_attempts`` times,
+        fetching a fresh part link on each attempt.
+
+        :param dict upload_info: Contains details received from the server, about the upload.
+        :param str filename: Name of the file the part belongs to.
+        :param int part_number: Part number, starting at 1.
+        :param bytes data: Content of the part.
+        :param str content_type: Content type of the file.
+        :returns: etag of the uploaded part.
+        :rtype: str
+        """
+        attempt = 1
+        max_attempts = max(1, self.config.multipart_upload_part_attempts)
+        backoff = 0.75  # Seconds to wait before retry, times the attempt number
+
+        while True:
+            try:
+                part_url = self._get_upload_part_link(upload_info, filename, part_number)
+                # keep data as a stream so that we don't need to worry how it was
+                # encoded.
+                return self._upload_data_to_storage(BytesIO(data), content_type, len(data), part_url)
+            except Exception as e:
+                if attempt >= max_attempts:
+                    raise
+                LOG.debug("Upload of part %d failed, attempt %d of %d. Retrying: %s" %
+                          (part_number, attempt, max_attempts, e))
+                time.sleep(float(attempt) * backoff)
+                attempt += 1
+
     def _get_upload_part_link(self, upload_info, filename, part_number):
         """
         Internal function to get the url to upload the next part of a file to the
@@ -4039,13 +4444,16 @@ class Shotgun(object):
 
         url = urllib.parse.urlunparse((self.config.scheme, self.config.server,
                                        "/upload/api_get_upload_link_for_part", None, None, None))
-        result = self._send_form(url, params)
+        try:
+            result = self._send_form(url, params)
+        except ShotgunError as e:
+            raise _UploadRejectedError(str(e))
 
         # Response is of the form: 1\n<url> (for success) or 0\n (for failure).
         # In case of success, we know we the second line of the response contains the
         # requested URL.
         if not result.startswith("1"):
-            raise ShotgunError("Unable get upload part link: %s" % result)
+            raise _UploadRejectedError("Unable get upload part link: %s" % result)
 
         LOG.debug("Got next upload link from server for multipart upload.")
         return result.split("\n", 2)[1]
@@ -4089,6 +4497,9 @@ class Shotgun(object):
                 else:
                     if e.code == 503:
                         raise ShotgunError("Got a 503 response when uploading to %s: %s" % (storage_url, e))
+                    if 400 <= e.code < 500:
+                        # The storage refused the request itself, for instance an expired link
+                        raise _UploadRejectedError("Storage refused the upload to %s: %s" % (storage_url, e))
                     raise ShotgunError("Unanticipated error occurred uploading to %s: %s" % (storage_url, e))
 
             else:
@@ -4117,11 +4528,14 @@ class Shotgun(object):
 
         url = urllib.parse.urlunparse((self.config.scheme, self.config.server,
                                        "/upload/api_complete_multipart_upload", None, None, None))
-        result = self._send_form(url, params)
+        try:
+            result = self._send_form(url, params)
+        except ShotgunError as e:
+            raise _UploadRejectedError(str(e))
 
         # Response is of the form: 1\n or 0\n to indicate success or failure of the call.
         if not result.startswith("1"):
-            raise ShotgunError("Unable get upload part link: %s" % result)
+            raise _UploadRejectedError("Unable to complete multipart upload: %s" % result)
 
     def _requires_direct_s3_upload(self, entity_type, field_name):
         """
@@ -4193,6 +4607,466 @@ class Shotgun(object):
         return six.ensure_text(result)
 
 
+class _UploadRejectedError(ShotgunError):
+    """
+    Raised when the server or the Cloud storage answered an upload request with a
+    refusal, as opposed to a network error. A resumed multipart upload refused this way
+    is no longer valid and has to be started again.
+    """
+    pass
+
+
+class _UploadJournal(object):
+    """
+    On-disk record of the progress of a resumable multipart upload.
+
+    The journal is a small json file stored next to the uploaded file. It keeps the
+    ``upload_info`` received from the server and the etag of every part uploaded so far,
+    along with the size and modification time of the file so a journal is never applied
+    to a file that changed since.
+    """
+
+    SUFFIX = ".sgupload"
+    # Journals older than this are ignored, as the server will have expired the upload.
+    MAX_AGE_SECS = 24 * 60 * 60
+
+    def __init__(self, path, chunk_size, is_thumbnail):
+        """
+        :param str path: Full path to the file being uploaded.
+        :param int chunk_size: Size of the parts the file is split into.
+        :param bool is_thumbnail: Indicates if the attachment is a thumbnail.
+        """
+        self.path = path + self.SUFFIX
+        self.parts = {}
+        self._upload_info = None
+        self._lock = threading.Lock()
+        file_stat = os.stat(path)
+        self._file_key = {
+            "filename": os.path.basename(path),
+            "size": file_stat.st_size,
+            "mtime": file_stat.st_mtime,
+            "chunk_size": chunk_size,
+            "is_thumbnail": is_thumbnail,
+        }
+        self._created = None
+
+    def load(self):
+        """
+        Read the journal of a previous attempt at uploading the same file.
+
+        :returns: The ``upload_info`` of the interrupted upload, or ``None`` if there is
+            no usable journal.
+        :rtype: dict
+        """
+        try:
+            with open(self.path, "r") as f:
+                state = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if state.get("file") != self._file_key or \
+           time.time() - state.get("created", 0) > self.MAX_AGE_SECS:
+            LOG.debug("Ignoring out of date upload journal %s" % self.path)
+            self.remove()
+            return None
+
+        self._created = state["created"]
+        self._upload_info = state["upload_info"]
+        self.parts = dict((int(k), v) for k, v in six.iteritems(state.get("parts") or {}))
+        LOG.debug("Resuming upload from %s, %d parts already uploaded" % (self.path, len(self.parts)))
+        return self._upload_info
+
+    def start(self, upload_info):
+        """
+        Start journaling a new upload.
+
+        :param dict upload_info: Upload details received from the server.
+        """
+        with self._lock:
+            self._created = time.time()
+            self._upload_info = upload_info
+            self.parts = {}
+            self._write()
+
+    def add_part(self, part_number, etag):
+        """
+        Record a successfully uploaded part.
+
+        :param int part_number: Part number, starting at 1.
+        :param str etag: Etag returned by the storage for the part.
+        """
+        with self._lock:
+            self.parts[part_number] = etag
+            self._write()
+
+    def remove(self):
+        """
+        Delete the journal once the upload is complete.
+        """
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _write(self):
+        state = {
+            "file": self._file_key,
+            "created": self._created,
+            "upload_info": self._upload_info,
+            "parts": dict((str(k), v) for k, v in six.iteritems(self.parts)),
+        }
+        # Write to a temporary file first so a crash never leaves a truncated journal.
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            if six.PY3:
+                os.replace(tmp_path, self.path)
+            else:
+                if os.path.exists(self.path):
+                    os.remove(self.path)
+                os.rename(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            # Failing to journal only loses the ability to resume.
+            LOG.debug("Could not write upload journal %s: %s" % (self.path, e))
+
+
+class _ConnectionPool(object):
+    """
+    Thread-safe pool of keep-alive :class:`Http` connections, kept per host.
+
+    A request checks a connection out for the calling thread and checks it back in once
+    the response is read, so a connection is never used by two threads at once and is
+    reused by the next request on any thread. A connection that fails is discarded on its
+    own without touching the others.
+    """
+
+    def __init__(self, factory, max_size, idle_timeout):
+        """
+        :param factory: Callable returning a new :class:`Http` connection.
+        :param int max_size: Maximum number of connections per host. :meth:`checkout` waits
+            for a connection to be checked in once this many are in use.
+        :param idle_timeout: Seconds an idle connection is kept before it is closed.
+        """
+        self._factory = factory
+        self.max_size = max(1, max_size)
+        self.idle_timeout = idle_timeout
+        self._condition = threading.Condition()
+        # {host: [(connection, time checked in), ...]}, most recently used last
+        self._idle = {}
+        # {host: number of connections checked out}
+        self._in_use = {}
+        # {connection: host} of the connections checked out
+        self._hosts = {}
+        self._closed = False
+
+    def checkout(self, host):
+        """
+        Return a connection to ``host`` for the calling thread.
+
+        Idle connections are reused most recent first. Ones that sat idle for longer than
+        the idle timeout, or that fail the health check, are closed and skipped.
+
+        :param str host: Server the connection is for.
+        :returns: :class:`Http` connection that must be passed back to :meth:`checkin` or
+            :meth:`discard`.
+        """
+        stale = []
+        with self._condition:
+            while True:
+                idle = self._idle.get(host, [])
+                connection = None
+                while idle:
+                    candidate, checked_in = idle.pop()
+                    if time.time() - checked_in <= self.idle_timeout and self._is_healthy(candidate):
+                        connection = candidate
+                        break
+                    stale.append(candidate)
+                if connection is not None or self._in_use.get(host, 0) < self.max_size:
+                    break
+                self._condition.wait()
+            self._in_use[host] = self._in_use.get(host, 0) + 1
+
+        for candidate in stale:
+            LOG.debug("Closing stale pooled connection to %s" % host)
+            self._close_http(candidate)
+
+        if connection is None:
+            try:
+                connection = self._factory()
+            except Exception:
+                self._release(host)
+                raise
+        with self._condition:
+            self._hosts[connection] = host
+        return connection
+
+    def checkin(self, connection):
+        """
+        Return a healthy connection to the pool.
+
+        :param connection: Connection received from :meth:`checkout`.
+        """
+        with self._condition:
+            host = self._hosts.pop(connection)
+            if not self._closed:
+                self._idle.setdefault(host, []).append((connection, time.time()))
+            self._in_use[host] -= 1
+            self._condition.notify()
+            if not self._closed:
+                return
+        self._close_http(connection)
+
+    def discard(self, connection):
+        """
+        Close a connection that failed instead of returning it to the pool.
+
+        :param connection: Connection received from :meth:`checkout`.
+        """
+        with self._condition:
+            host = self._hosts.pop(connection)
+        LOG.debug("Evicting failed connection to %s" % host)
+        self._close_http(connection)
+        self._release(host)
+
+    def close(self):
+        """
+        Close the idle connections. Connections still checked out are closed when they
+        are checked in.
+        """
+        with self._condition:
+            self._closed = True
+            idle = [connection for connections in self._idle.values() for connection, _ in connections]
+            self._idle.clear()
+        for connection in idle:
+            self._close_http(connection)
+
+    def _release(self, host):
+        with self._condition:
+            self._in_use[host] -= 1
+            self._condition.notify()
+
+    @staticmethod
+    def _is_healthy(connection):
+        """
+        Check that the sockets of an idle connection were not closed by the server.
+
+        An idle keep-alive socket has nothing to read, so a readable one has either been
+        closed by the server or holds data that does not belong to any request.
+        """
+        for conn in connection.connections.values():
+            sock = getattr(conn, "sock", None)
+            if sock is None:
+                continue
+            try:
+                readable, _, _ = select.select([sock], [], [], 0)
+            except Exception:
+                return False
+            if readable:
+                return False
+        return True
+
+    @staticmethod
+    def _close_http(connection):
+        for conn in connection.connections.values():
+            try:
+                conn.close()
+            except Exception:
+                pass
+        connection.connections.clear()
+
+
+class _LRUCache(object):
+    """
+    Thread-safe mapping holding up to ``max_size`` items, dropping the least recently
+    used item first.
+    """
+
+    def __init__(self, max_size):
+        """
+        :param int max_size: Maximum number of items kept.
+        """
+        self.max_size = max_size
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """
+        Return the item stored for ``key``, or ``default`` if there is none.
+        """
+        with self._lock:
+            try:
+                value = self._items.pop(key)
+            except KeyError:
+                return default
+            # Re-inserted to mark it as the most recently used
+            self._items[key] = value
+            return value
+
+    def set(self, key, value):
+        """
+        Store an item, dropping the least recently used one if the cache is full.
+        """
+        with self._lock:
+            self._items.pop(key, None)
+            self._items[key] = value
+            if len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def __len__(self):
+        return len(self._items)
+
+
+class _TransferStats(object):
+    """
+    Counts the rpc requests and responses of a client and the bytes compression saved.
+
+    Available as ``sg.transfer_stats``, see ``_Config.compress_requests``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """
+        Set every count back to zero.
+        """
+        with self._lock:
+            # Number of requests and size of their bodies before and after compression
+            self.requests = 0
+            self.compressed_requests = 0
+            self.request_bytes = 0
+            self.request_bytes_sent = 0
+            # Number of responses, and of responses the server sent compressed
+            self.responses = 0
+            self.compressed_responses = 0
+
+    @property
+    def request_bytes_saved(self):
+        """
+        Number of request body bytes compression kept off the wire.
+        """
+        return self.request_bytes - self.request_bytes_sent
+
+    def add_request(self, size, compressed_size):
+        """
+        Record a request body of ``size`` bytes, compressed to ``compressed_size`` bytes.
+
+        The body is sent as is when compression doesn't make it smaller.
+        """
+        with self._lock:
+            self.requests += 1
+            self.request_bytes += size
+            if compressed_size < size:
+                self.compressed_requests += 1
+                self.request_bytes_sent += compressed_size
+            else:
+                self.request_bytes_sent += size
+
+    def add_response(self, compressed):
+        """
+        Record a response, sent compressed by the server or not.
+        """
+        with self._lock:
+            self.responses += 1
+            if compressed:
+                self.compressed_responses += 1
+
+
+class _JsonCodec(object):
+    """
+    Encodes rpc payloads and decodes responses with the standard library json module.
+    """
+
+    name = "json"
+
+    def dumps(self, data):
+        """
+        Encode data as utf-8 json.
+        """
+        return six.ensure_binary(json.dumps(data, ensure_ascii=False))
+
+    def loads(self, body, object_hook=None):
+        """
+        Decode a json document.
+
+        :param object_hook: Optional function called with every decoded json object,
+            innermost first, whose return value is used in its place.
+        """
+        return json.loads(body, object_hook=object_hook)
+
+
+class _OrjsonCodec(_JsonCodec):
+    """
+    Json codec using orjson.
+
+    Data orjson can't encode the way the json module does, such as integers larger than
+    64 bits, falls back on the json module. So do the dates, times and dataclasses orjson
+    would encode but the json module refuses, which then raise TypeError as before. See
+    ``_Config.json_codec`` for the differences left. orjson has no object hook, and walking the
+    decoded data again to call one is slower than the json module calling it while
+    decoding, so documents decoded with a hook use the json module too.
+    """
+
+    name = "orjson"
+
+    def dumps(self, data):
+        # Non string keys are converted to strings, as the json module does. Types the
+        # json module doesn't know are passed to _reject instead of being encoded.
+        option = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME |
+                  orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_SUBCLASS)
+        try:
+            return orjson.dumps(data, default=self._reject, option=option)
+        except TypeError:
+            return _JsonCodec.dumps(self, data)
+
+    @staticmethod
+    def _reject(value):
+        raise TypeError("Type is not JSON serializable: %s" % type(value).__name__)
+
+    def loads(self, body, object_hook=None):
+        if object_hook:
+            return _JsonCodec.loads(self, body, object_hook)
+        try:
+            return orjson.loads(body)
+        except ValueError:
+            return _JsonCodec.loads(self, body)
+
+
+class _UjsonCodec(_JsonCodec):
+    """
+    Json codec using ujson.
+
+    Data ujson can't handle falls back on the json module, as do documents decoded with
+    an object hook, see :class:`_OrjsonCodec`.
+    """
+
+    name = "ujson"
+
+    def dumps(self, data):
+        try:
+            return six.ensure_binary(ujson.dumps(data, ensure_ascii=False, escape_forward_slashes=False))
+        except (TypeError, ValueError, OverflowError):
+            return _JsonCodec.dumps(self, data)
+
+    def loads(self, body, object_hook=None):
+        if object_hook:
+            return _JsonCodec.loads(self, body, object_hook)
+        try:
+            return ujson.loads(body)
+        except (ValueError, OverflowError):
+            return _JsonCodec.loads(self, body)
+
+
+# {name: codec instance, or None if its library isn't installed}
+_JSON_CODECS = {
+    "json": _JsonCodec(),
+    "orjson": _OrjsonCodec() if orjson else None,
+    "ujson": _UjsonCodec() if ujson else None,
+}
+
+
 class CACertsHTTPSConnection(http_client.HTTPConnection):
     """"
     This class allows to create an HTTPS connection that uses the custom certificates
@@ -4388,8 +5262,100 @@ def _translate_filters_simple(sg_filter):
     return condition
 
 
+def _parse_datetime_string(value):
+    """
+    Parse a ``YYYY-MM-DDTHH:MM:SSZ`` date time string received from the server.
+
+    Reading the fields from their fixed positions is much faster than ``time.strptime``,
+    which is only used for strings with other separators.
+
+    :param str value: Date time string, already matched against ``_DATE_TIME_PATTERN``.
+    :returns: Naive :class:`datetime.datetime`.
+    :raises ValueError: If the string is not a valid date time.
+    """
+    if (value[4] == "-" and value[7] == "-" and value[10] == "T" and
+            value[13] == ":" and value[16] == ":" and value[19] == "Z"):
+        return datetime.datetime(int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                                 int(value[11:13]), int(value[14:16]), int(value[17:19]))
+    # strptime was not on datetime in python2.4
+    return datetime.datetime(*time.strptime(value, "%Y-%m-%dT%H:%M:%SZ")[:6])
+
+
+def _gzip_compress(data, level=6):
+    """
+    Return data compressed in the gzip format.
+
+    ``gzip.compress`` is not available on Python 2, so zlib writes the gzip header.
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def _get_json_codec(name):
+    """
+    Return the json codec called ``name``, see ``_Config.json_codec``.
+
+    :param str name: ``"auto"``, ``"json"``, ``"orjson"`` or ``"ujson"``.
+    :raises ValueError: If ``name`` is not one of those.
+    """
+    if name == "auto":
+        return _JSON_CODECS["orjson"] or _JSON_CODECS["ujson"] or _JSON_CODECS["json"]
+    if name not in _JSON_CODECS:
+        raise ValueError("Unknown json codec '%s', expected one of auto, json, orjson or ujson." % name)
+    if _JSON_CODECS[name] is None:
+        LOG.debug("%s is not installed, using the json module instead" % name)
+        return _JSON_CODECS["json"]
+    return _JSON_CODECS[name]
+
+
 def _version_str(version):
     """
     Convert a tuple of int's to a '.' separated str.
     """
     return ".".join(map(str, version))
+
+
+def _prefetch_iter(iterable, depth=1):
+    """
+    Iterate over ``iterable`` in a background thread, staying up to ``depth`` items ahead.
+
+    Exceptions raised by the iterable are raised again by the generator. If the generator
+    is closed before the end, the background thread stops after its current item.
+    """
+    items = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+    done = object()
+
+    def put(item):
+        # Wait for room, giving up if the consumer went away
+        while not stop.is_set():
+            try:
+                items.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put((item, None)):
+                    return
+        except Exception as e:
+            put((done, e))
+            return
+        put((done, None))
+
+    thread = threading.Thread(target=produce, name="ShotgunPrefetch")
+    thread.daemon = True
+    thread.start()
+    try:
+        while True:
+            item, error = items.get()
+            if error is not None:
+                raise error
+            if item is done:
+                return
+            yield item
+    finally:
+        stop.set()
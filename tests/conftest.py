@@ -0,0 +1,10 @@
+"""Run from the repository root with:
+
+    python -m pytest tests
+
+The modules under test are imported from src, as Maya imports them.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
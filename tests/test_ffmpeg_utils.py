@@ -0,0 +1,51 @@
+"""Tests of the FFmpeg command builders."""
+import ffmpeg_utils
+
+OUTPUTS = [
+    ('shot.mp4', ffmpeg_utils.ENCODE_PROFILES['dailies-fast']),
+    ('shot_editorial.mov', ffmpeg_utils.ENCODE_PROFILES['editorial-prores']),
+    ('shot_mobile.mp4', ffmpeg_utils.ENCODE_PROFILES['mobile-proxy']),
+]
+
+def split_outputs(args, output_paths):
+    """Return the options given to each output path, keyed by path."""
+    options = {}
+    start = 0
+    for output_path in output_paths:
+        end = args.index(output_path)
+        options[output_path] = args[start:end]
+        start = end + 1
+    return options
+
+def option(options, name):
+    return options[options.index(name) + 1] if name in options else None
+
+def test_frame_count_applies_to_every_output():
+    args = ffmpeg_utils.build_outputs_args(OUTPUTS, frame_count=120)
+    options = split_outputs(args, [path for path, _ in OUTPUTS])
+    for output_path, _ in OUTPUTS:
+        assert option(options[output_path], '-frames:v') == '120', output_path
+        assert options[output_path].count('-frames:v') == 1
+
+def test_frame_count_of_a_single_output():
+    args = ffmpeg_utils.build_outputs_args(OUTPUTS[:1], frame_count=24)
+    assert args[-3:] == ['-frames:v', '24', 'shot.mp4']
+    assert '-map' not in args
+
+def test_no_frame_count():
+    args = ffmpeg_utils.build_outputs_args(OUTPUTS)
+    assert '-frames:v' not in args
+
+def test_outputs_share_the_thread_limit():
+    args = ffmpeg_utils.build_outputs_args(OUTPUTS, threads=7)
+    options = split_outputs(args, [path for path, _ in OUTPUTS])
+    assert [option(options[path], '-threads') for path, _ in OUTPUTS] == ['2', '2', '2']
+
+def test_sequence_command_limits_outputs_not_the_input():
+    command = ffmpeg_utils.build_sequence_command(
+        'ffmpeg', 'shot.%04d.jpg', 1001, 24, 'shot.mp4', frame_count=48, extra_outputs=OUTPUTS[1:]
+    )
+    input_index = command.index('-i')
+    assert '-frames:v' not in command[:input_index]
+    assert command.count('-frames:v') == len(OUTPUTS)
+    assert option(command, '-start_number') == '1001'
@@ -0,0 +1,102 @@
+"""Tests of the frame range and animation snapshot helpers."""
+import pytest
+
+import frame_utils
+
+def curve(*keys, cycles=False):
+    """Return a snapshot curve with keys given as (time, value) pairs."""
+    return {'cycles': cycles, 'keys': [[time, value, 0.0, 0.0, 1.0, 1.0] for time, value in keys]}
+
+def test_parse_frame_ranges_merges_and_sorts():
+    assert frame_utils.parse_frame_ranges("100, 40-60; 55-70, 71") == [(40, 71), (100, 100)]
+
+def test_parse_frame_ranges_swaps_reversed_ranges():
+    assert frame_utils.parse_frame_ranges("60-40") == [(40, 60)]
+
+def test_parse_frame_ranges_ignores_empty_parts():
+    assert frame_utils.parse_frame_ranges(" , 5,") == [(5, 5)]
+
+def test_parse_frame_ranges_rejects_invalid_text():
+    with pytest.raises(ValueError, match="Invalid frame range 'a-b'"):
+        frame_utils.parse_frame_ranges("1-10, a-b")
+
+def test_diff_anim_snapshots_unchanged():
+    snapshot = {'ball.ty': curve((1, 0.0), (10, 5.0), (20, 0.0))}
+    assert frame_utils.diff_anim_snapshots(snapshot, dict(snapshot)) == []
+
+def test_diff_anim_snapshots_changed_key_affects_neighbouring_keys():
+    old = {'ball.ty': curve((1, 0.0), (10, 5.0), (20, 0.0))}
+    new = {'ball.ty': curve((1, 0.0), (10, 6.0), (20, 0.0))}
+    assert frame_utils.diff_anim_snapshots(old, new) == [(1, 20)]
+
+def test_diff_anim_snapshots_added_key_rounds_outwards():
+    old = {'ball.ty': curve((1, 0.0), (10.5, 5.0), (20, 0.0))}
+    new = {'ball.ty': curve((1, 0.0), (10.5, 5.0), (14, 3.0), (20, 0.0))}
+    assert frame_utils.diff_anim_snapshots(old, new) == [(10, 20)]
+
+def test_diff_anim_snapshots_last_key_is_unbounded_after():
+    old = {'ball.ty': curve((1, 0.0), (10, 5.0), (20, 0.0))}
+    new = {'ball.ty': curve((1, 0.0), (10, 5.0), (20, 1.0))}
+    (start, end), = frame_utils.diff_anim_snapshots(old, new)
+    assert start == 10
+    assert frame_utils.clip_frame_ranges([(start, end)], 1, 100) == [(10, 100)]
+
+def test_diff_anim_snapshots_cycling_curve_affects_every_frame():
+    old = {'ball.ty': curve((1, 0.0), (10, 5.0))}
+    new = {'ball.ty': curve((1, 0.0), (10, 5.0), cycles=True)}
+    ranges = frame_utils.diff_anim_snapshots(old, new)
+    assert frame_utils.clip_frame_ranges(ranges, 1, 100) == [(1, 100)]
+
+def test_diff_anim_snapshots_new_and_removed_curves():
+    old = {'ball.tx': curve((5, 0.0), (15, 1.0))}
+    new = {'ball.ty': curve((30, 0.0), (40, 1.0))}
+    ranges = frame_utils.diff_anim_snapshots(old, new)
+    # Every key of both curves changed, so the whole timeline is affected
+    assert frame_utils.clip_frame_ranges(ranges, 1, 100) == [(1, 100)]
+
+def test_diff_anim_snapshots_merges_curves():
+    old = {'ball.tx': curve((1, 0.0), (10, 1.0), (20, 0.0)),
+           'ball.ty': curve((15, 0.0), (25, 1.0), (35, 0.0))}
+    new = {'ball.tx': curve((1, 0.0), (10, 2.0), (20, 0.0)),
+           'ball.ty': curve((15, 0.0), (25, 2.0), (35, 0.0))}
+    assert frame_utils.diff_anim_snapshots(old, new) == [(1, 35)]
+
+def test_segment_ranges_align_to_segment_frames():
+    assert frame_utils.segment_ranges(1001, 1100, 48) == [(1001, 1007), (1008, 1055), (1056, 1100)]
+
+def test_segment_ranges_stay_aligned_when_the_range_moves():
+    # A later start only changes the first segment, so the others can be reused
+    assert frame_utils.segment_ranges(1010, 1100, 48) == [(1010, 1055), (1056, 1100)]
+
+def test_segment_ranges_single_frame_and_empty():
+    assert frame_utils.segment_ranges(5, 5) == [(5, 5)]
+    assert frame_utils.segment_ranges(10, 9) == []
+
+def make_sequence(frames):
+    """Return a sequence of the given {frame: mtime} without touching the disk."""
+    return frame_utils.FrameSequence('frames', 'shot', 'jpg', {frame: (100, mtime) for frame, mtime in frames.items()})
+
+def test_find_sequence_problems_complete_sequence():
+    sequence = make_sequence({frame: 1000.0 for frame in range(1, 11)})
+    assert frame_utils.find_sequence_problems(sequence, 1, 10, range(1, 11), 1000.0) == []
+
+def test_find_sequence_problems_missing_frames():
+    sequence = make_sequence({frame: 1000.0 for frame in (1, 2, 5, 6, 10)})
+    assert frame_utils.find_sequence_problems(sequence, 1, 12) == ["missing frames 3-4, 7-9, 11-12"]
+
+def test_find_sequence_problems_outdated_frames():
+    frames = {frame: 1000.0 for frame in range(1, 11)}
+    frames.update({4: 500.0, 5: 500.0, 9: 500.0})
+    sequence = make_sequence(frames)
+    assert frame_utils.find_sequence_problems(sequence, 1, 10, range(1, 11), 1000.0) == [
+        "frames older than the capture 4-5, 9"
+    ]
+
+def test_find_sequence_problems_allows_clock_difference():
+    sequence = make_sequence({1: 1000.0 - frame_utils.MTIME_TOLERANCE / 2})
+    assert frame_utils.find_sequence_problems(sequence, 1, 1, [1], 1000.0) == []
+
+def test_find_sequence_problems_only_checks_captured_frames():
+    # Frames reused from the previous capture may be older than this one
+    sequence = make_sequence({1: 500.0, 2: 1000.0})
+    assert frame_utils.find_sequence_problems(sequence, 1, 2, [2], 1000.0) == []
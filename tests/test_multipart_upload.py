@@ -0,0 +1,92 @@
+"""Tests of the ShotGrid client's concurrent multipart uploader."""
+import os
+import time
+import random
+import threading
+
+import pytest
+
+from shotgun_api3 import Shotgun
+
+HOST = "test.shotgrid.autodesk.com"
+
+def make_shotgun(chunk_size):
+    sg = Shotgun("https://" + HOST, "test", "test", connect=False)
+    sg._MULTIPART_UPLOAD_CHUNK_SIZE = chunk_size
+    sg.config.multipart_upload_concurrency = 4
+    return sg
+
+def write_file(tmp_path, size):
+    path = tmp_path / "upload.bin"
+    path.write_bytes(os.urandom(size))
+    return str(path)
+
+def test_multipart_etags_are_in_part_order(tmp_path):
+    sg = make_shotgun(chunk_size=10)
+    path = write_file(tmp_path, 95)
+    rng = random.Random(0)
+    finish_order = []
+    completed = []
+    lock = threading.Lock()
+
+    def _upload_part(upload_info, filename, part_number, data, content_type):
+        # Random delays make the parts finish out of order
+        time.sleep(rng.uniform(0, 0.05))
+        with lock:
+            finish_order.append(part_number)
+        return "etag-%d" % part_number
+
+    sg._upload_part_to_storage = _upload_part
+    sg._complete_multipart_upload = lambda upload_info, filename, etags: completed.append(list(etags))
+    sg._multipart_upload_file_to_storage(path, {"upload_type": "Attachment"})
+
+    assert sorted(finish_order) == list(range(1, 11))
+    assert completed == [["etag-%d" % part_number for part_number in range(1, 11)]]
+
+def test_multipart_part_is_retried_with_a_new_link(tmp_path):
+    sg = make_shotgun(chunk_size=10)
+    path = write_file(tmp_path, 30)
+    with open(path, "rb") as f:
+        content = f.read()
+    links = []
+    sent = {}
+    completed = []
+    lock = threading.Lock()
+
+    def _get_upload_part_link(upload_info, filename, part_number):
+        with lock:
+            links.append(part_number)
+            return "https://storage/%d/%d" % (part_number, links.count(part_number))
+
+    def _upload_data_to_storage(data, content_type, size, storage_url):
+        if storage_url == "https://storage/2/1":
+            raise IOError("Connection reset")
+        with lock:
+            sent[storage_url] = data.read()
+        return "etag-" + storage_url.rsplit("/", 2)[1]
+
+    sg._get_upload_part_link = _get_upload_part_link
+    sg._upload_data_to_storage = _upload_data_to_storage
+    sg._complete_multipart_upload = lambda upload_info, filename, etags: completed.append(list(etags))
+    sg._multipart_upload_file_to_storage(path, {"upload_type": "Attachment"})
+
+    # Part 2 failed once and was sent again with a second link
+    assert sorted(links) == [1, 2, 2, 3]
+    assert sent["https://storage/2/2"] == content[10:20]
+    assert completed == [["etag-1", "etag-2", "etag-3"]]
+
+def test_multipart_failed_part_is_not_completed(tmp_path):
+    sg = make_shotgun(chunk_size=10)
+    path = write_file(tmp_path, 30)
+    completed = []
+
+    def _upload_part(upload_info, filename, part_number, data, content_type):
+        if part_number == 2:
+            raise IOError("Connection reset")
+        return "etag-%d" % part_number
+
+    sg._upload_part_to_storage = _upload_part
+    sg._complete_multipart_upload = lambda upload_info, filename, etags: completed.append(list(etags))
+    with pytest.raises(IOError, match="Connection reset"):
+        sg._multipart_upload_file_to_storage(path, {"upload_type": "Attachment"})
+    assert completed == []
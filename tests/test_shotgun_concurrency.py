@@ -0,0 +1,92 @@
+"""Tests of the ShotGrid client's connection pool."""
+import time
+import threading
+
+from shotgun_api3.shotgun import _ConnectionPool
+
+HOST = "test.shotgrid.autodesk.com"
+
+class FakeConnection(object):
+    """Stands in for the httplib connection an Http object keeps per host."""
+
+    def __init__(self):
+        self.sock = None
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+class FakeHttp(object):
+    """Stands in for Http, with one open connection."""
+
+    def __init__(self):
+        self.connection = FakeConnection()
+        self.connections = {HOST: self.connection}
+
+    @property
+    def closed(self):
+        return self.connection.closed
+
+def make_pool(max_size=4, idle_timeout=60):
+    return _ConnectionPool(FakeHttp, max_size, idle_timeout)
+
+def test_checkout_waits_for_checkin_at_max_size():
+    pool = make_pool(max_size=1)
+    first = pool.checkout(HOST)
+    checked_out = threading.Event()
+    second = []
+
+    def _checkout():
+        second.append(pool.checkout(HOST))
+        checked_out.set()
+
+    thread = threading.Thread(target=_checkout)
+    thread.daemon = True
+    thread.start()
+    assert not checked_out.wait(0.2)
+
+    pool.checkin(first)
+    assert checked_out.wait(5)
+    thread.join(5)
+    # The waiting thread reuses the connection that was checked in
+    assert second == [first]
+
+def test_idle_connection_past_timeout_is_closed():
+    pool = make_pool(idle_timeout=0.05)
+    first = pool.checkout(HOST)
+    pool.checkin(first)
+    time.sleep(0.1)
+
+    second = pool.checkout(HOST)
+    assert second is not first
+    assert first.closed
+    assert not second.closed
+
+def test_idle_connection_within_timeout_is_reused():
+    pool = make_pool()
+    first = pool.checkout(HOST)
+    pool.checkin(first)
+    assert pool.checkout(HOST) is first
+    assert not first.closed
+
+def test_discard_closes_only_that_connection():
+    pool = make_pool()
+    kept, idle, failed = [pool.checkout(HOST) for _ in range(3)]
+    pool.checkin(idle)
+    pool.discard(failed)
+
+    assert failed.closed
+    assert not kept.closed
+    assert not idle.closed
+    # The idle connection is still pooled and the discarded one is gone
+    assert pool.checkout(HOST) is idle
+    third = pool.checkout(HOST)
+    assert third not in (kept, idle, failed)
+
+def test_discard_frees_a_slot_at_max_size():
+    pool = make_pool(max_size=1)
+    failed = pool.checkout(HOST)
+    pool.discard(failed)
+    # Would wait forever if the discarded connection still held the only slot
+    replacement = pool.checkout(HOST)
+    assert replacement is not failed
@@ -0,0 +1,66 @@
+"""Tests of the conversion of date times received from ShotGrid."""
+import json
+import datetime
+
+import pytest
+
+from shotgun_api3 import Shotgun
+
+RESPONSE = {
+    "results": {
+        "entities": [
+            {
+                "type": "Version",
+                "id": 1,
+                "created_at": "2024-03-05T10:20:30Z",
+                "code": "SOUL_1001_JUL_005_anim",
+                # 20 characters long without being a date time
+                "description": "not a date time 1234",
+                "sg_status_list": "rev",
+                "entity": {"type": "Shot", "id": 2, "updated_at": "2024-12-31T23:59:59Z"},
+                "tags": ["2024-01-01T00:00:00Z", ["2023-06-15T12:00:00Z", "plain"], {"at": "2022-02-28T08:00:00Z"}],
+                "sg_due": "2024-03-05",
+                "frames": [1001, 1100],
+                "bad_date": "2024-13-45T99:99:99Z",
+            },
+        ],
+        "paging_info": {"entity_count": 1},
+    },
+}
+
+@pytest.fixture(params=[True, False], ids=["local", "utc"])
+def sg(request):
+    return Shotgun("https://test.shotgrid.autodesk.com", "test", "test", connect=False,
+                   convert_datetimes_to_utc=request.param)
+
+def test_object_hook_matches_transform_inbound(sg):
+    body = json.dumps(RESPONSE)
+    hooked = json.loads(body, object_hook=sg._inbound_object_hook())
+    transformed = sg._transform_inbound(json.loads(body))
+    assert hooked == transformed
+
+def test_object_hook_converts_nested_date_times(sg):
+    hooked = json.loads(json.dumps(RESPONSE), object_hook=sg._inbound_object_hook())
+    entity = hooked["results"]["entities"][0]
+    for value in (entity["created_at"], entity["entity"]["updated_at"], entity["tags"][0],
+                  entity["tags"][1][0], entity["tags"][2]["at"]):
+        assert isinstance(value, datetime.datetime)
+    created_at = entity["created_at"]
+    if sg.config.convert_datetimes_to_utc:
+        # Converted to the local time zone
+        created_at = created_at.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    assert created_at == datetime.datetime(2024, 3, 5, 10, 20, 30)
+
+def test_object_hook_leaves_other_values(sg):
+    hooked = json.loads(json.dumps(RESPONSE), object_hook=sg._inbound_object_hook())
+    entity = hooked["results"]["entities"][0]
+    assert entity["description"] == "not a date time 1234"
+    assert entity["sg_due"] == "2024-03-05"
+    assert entity["bad_date"] == "2024-13-45T99:99:99Z"
+    assert entity["tags"][1][1] == "plain"
+    assert entity["frames"] == [1001, 1100]
+
+def test_decode_response_converts_date_times(sg):
+    body = json.dumps(RESPONSE).encode("utf-8")
+    decoded = sg._decode_response({"content-type": "application/json"}, body, sg._inbound_object_hook())
+    assert decoded == sg._transform_inbound(json.loads(body))
@@ -0,0 +1,136 @@
+"""Tests of the paged reads behind find and find_iter."""
+import time
+import random
+import threading
+
+import pytest
+
+from shotgun_api3 import Shotgun
+
+class FakeServerCaps(object):
+    """Stands in for ServerCapabilities, with or without paging counts."""
+
+    def __init__(self, host, without_counts):
+        self.host = host
+        self.without_counts = without_counts
+
+    def ensure_paging_info_without_counts_support(self):
+        return self.without_counts
+
+    def ensure_return_image_urls_support(self):
+        return False
+
+class FakeServer(object):
+    """Answers read requests for entity_count Shots, recording the pages requested."""
+
+    def __init__(self, entity_count, without_counts, delay=0):
+        self.entity_count = entity_count
+        self.without_counts = without_counts
+        self.delay = delay
+        self.pages = []
+        self._lock = threading.Lock()
+        self._rng = random.Random(0)
+
+    def call_rpc(self, method, params, **kwargs):
+        page = params["paging"]["current_page"]
+        per_page = params["paging"]["entities_per_page"]
+        with self._lock:
+            self.pages.append(page)
+            delay = self._rng.uniform(0, self.delay)
+        # Random delays make concurrent pages arrive out of order
+        time.sleep(delay)
+        ids = range((page - 1) * per_page, min(page * per_page, self.entity_count))
+        result = {"entities": [{"type": "Shot", "id": entity_id} for entity_id in ids]}
+        if self.without_counts:
+            result["paging_info"] = {"has_next_page": page * per_page < self.entity_count}
+        else:
+            result["paging_info"] = {"entity_count": self.entity_count}
+        return result
+
+def make_shotgun(entity_count, per_page, without_counts=False, concurrency=1, delay=0):
+    sg = Shotgun("https://test.shotgrid.autodesk.com", "test", "test", connect=False)
+    sg._server_caps = FakeServerCaps(sg.config.server, without_counts)
+    sg.config._records_per_page = per_page
+    sg.config.read_page_concurrency = concurrency
+    server = FakeServer(entity_count, without_counts, delay)
+    sg._call_rpc = server.call_rpc
+    return sg, server
+
+def ids(entities):
+    return [entity["id"] for entity in entities]
+
+@pytest.mark.parametrize("without_counts", [False, True])
+def test_find_reads_every_page_in_order(without_counts):
+    sg, server = make_shotgun(10, 3, without_counts)
+    assert ids(sg.find("Shot", [])) == list(range(10))
+    assert server.pages == [1, 2, 3, 4]
+
+@pytest.mark.parametrize("without_counts", [False, True])
+def test_find_stops_at_the_limit(without_counts):
+    sg, server = make_shotgun(10, 3, without_counts)
+    assert ids(sg.find("Shot", [], limit=7)) == list(range(7))
+    assert server.pages == [1, 2, 3]
+
+def test_find_limit_within_one_page():
+    sg, server = make_shotgun(10, 3)
+    assert ids(sg.find("Shot", [], limit=2)) == [0, 1]
+    assert server.pages == [1]
+
+def test_find_single_page():
+    sg, server = make_shotgun(10, 3)
+    assert ids(sg.find("Shot", [], page=2)) == [3, 4, 5]
+    assert server.pages == [2]
+
+@pytest.mark.parametrize("without_counts", [False, True])
+def test_find_without_results(without_counts):
+    sg, server = make_shotgun(0, 3, without_counts)
+    assert sg.find("Shot", []) == []
+    assert server.pages == [1]
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_find_iter_matches_find(prefetch):
+    sg, server = make_shotgun(10, 3)
+    assert ids(sg.find_iter("Shot", [], limit=8, prefetch=prefetch)) == list(range(8))
+
+def test_find_iter_reads_pages_as_they_are_consumed():
+    sg, server = make_shotgun(10, 3)
+    records = sg.find_iter("Shot", [])
+    assert ids(next(records) for _ in range(4)) == [0, 1, 2, 3]
+    assert server.pages == [1, 2]
+
+@pytest.mark.parametrize("without_counts", [False, True])
+def test_concurrent_pages_are_returned_in_order(without_counts):
+    sg, server = make_shotgun(100, 7, without_counts, concurrency=4, delay=0.02)
+    assert ids(sg.find("Shot", [])) == list(range(100))
+    assert ids(sg.find_iter("Shot", [])) == list(range(100))
+
+def test_concurrent_pages_stop_at_the_entity_count():
+    sg, server = make_shotgun(1234, 500, concurrency=4)
+    assert len(sg.find("Shot", [])) == 1234
+    assert sorted(server.pages) == [1, 2, 3]
+
+def test_concurrent_pages_without_counts_may_read_past_the_end():
+    sg, server = make_shotgun(1234, 500, without_counts=True, concurrency=4)
+    assert ids(sg.find("Shot", [])) == list(range(1234))
+    # Only has_next_page is known, so the whole window is requested
+    assert sorted(server.pages) == [1, 2, 3, 4, 5]
+
+@pytest.mark.parametrize("without_counts", [False, True])
+@pytest.mark.parametrize("limit, pages", [(600, [1, 2]), (1100, [1, 2, 3]), (1000, [1, 2])])
+def test_concurrent_pages_stop_at_the_limit(without_counts, limit, pages):
+    sg, server = make_shotgun(1234, 500, without_counts, concurrency=4)
+    assert ids(sg.find("Shot", [], limit=limit)) == list(range(limit))
+    assert sorted(server.pages) == pages
+
+def test_concurrent_page_error_is_raised():
+    sg, server = make_shotgun(100, 10, concurrency=4)
+    call_rpc = server.call_rpc
+
+    def _call_rpc(method, params, **kwargs):
+        if params["paging"]["current_page"] == 3:
+            raise IOError("Connection reset")
+        return call_rpc(method, params, **kwargs)
+
+    sg._call_rpc = _call_rpc
+    with pytest.raises(IOError, match="Connection reset"):
+        sg.find("Shot", [])